@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from pathlib import Path
-from typing import List
+from typing import List, Literal
 
 class Settings(BaseSettings):
     DEBUG: bool = False
@@ -11,10 +11,88 @@ class Settings(BaseSettings):
     
     BASE_DIR: Path = Path(__file__).resolve().parent.parent
     STAFFMAP_PATH: Path = BASE_DIR / "data" / "staffMap.json"
+    DOWNLOADS_DIR: Path = BASE_DIR / "downloads"
     
     WEBINSOURCE_BASE_URL: str = "https://secure.insource.co.jp/webinsource"
     COMPANY_CODE: str = "00000010"
     
+    # 常駐ブラウザプール設定
+    BROWSER_HEADLESS: bool = True
+    BROWSER_MAX_CONTEXTS: int = 8
+    BROWSER_MAX_USES: int = 200
+    
+    # ブラウザ処理の受付制御（同時実行数・待ち行列・既定の待ち時間上限）
+    SCHEDULER_MAX_CONCURRENCY: int = 6
+    SCHEDULER_MAX_QUEUE: int = 50
+    SCHEDULER_DEFAULT_TIMEOUT_SECONDS: float = 30.0
+    
+    # スクレイピング時に遮断するリソース（HTMLのみ必要なため）
+    BROWSER_BLOCK_RESOURCES: bool = True
+    BROWSER_BLOCK_RESOURCE_TYPES: List[str] = ["image", "stylesheet", "font", "media"]
+    BROWSER_BLOCK_URL_PATTERNS: List[str] = [
+        "google-analytics.com",
+        "googletagmanager.com",
+        "doubleclick.net",
+        "facebook.net",
+        "yahoo.co.jp/conversion",
+        "clarity.ms",
+    ]
+    
+    # ログインセッションキャッシュ設定
+    SESSION_CACHE_TTL_SECONDS: int = 1800
+    SESSION_CACHE_MAX_ENTRIES: int = 100
+    # ログイン確認済み認証情報（パスワードはソルト付きハッシュのみ保持）
+    CREDENTIAL_CACHE_TTL_SECONDS: int = 3600 * 8
+    
+    # ログイン後の詳細ページをブラウザを使わずHTTPで取得
+    HTTP_FAST_PATH_ENABLED: bool = True
+    HTTP_FAST_PATH_TIMEOUT: float = 10.0
+    HTTP_FAST_PATH_MAX_CONNECTIONS: int = 20
+    
+    # 研修詳細・受講者一覧のレスポンスキャッシュ
+    DETAIL_CACHE_TTL_SECONDS: int = 300
+    DETAIL_CACHE_MAX_ENTRIES: int = 500
+    # 一括取得時に同時に開くページ数
+    DETAIL_BATCH_CONCURRENCY: int = 4
+    
+    # 当日CSVマージ後の研修詳細・受講者一覧の事前取得（認証情報が未設定なら無効）
+    PREFETCH_LOGIN_ID: str = ""
+    PREFETCH_PASSWORD: str = ""
+    PREFETCH_POLL_SECONDS: int = 60
+    PREFETCH_CONCURRENCY: int = 1
+    PREFETCH_INTERVAL_SECONDS: float = 1.0
+    PREFETCH_CACHE_TTL_SECONDS: int = 3600 * 12
+    # 事前取得専用キャッシュの件数上限（当日の対象件数の方が多ければその件数まで広げる）
+    PREFETCH_CACHE_MAX_ENTRIES: int = 20000
+    PREFETCH_TRAINEES: bool = True
+    
+    # 研修CSVのダウンロード: 全日程を1回の期間検索で取得し、開催日毎に分割する
+    # 結果がDOWNLOAD_RANGE_MAX_ROWS件以上（打ち切りの可能性）なら日付毎の検索に切り替える
+    DOWNLOAD_RANGE_SEARCH: bool = True
+    DOWNLOAD_RANGE_MAX_ROWS: int = 2000
+    # 差分更新: 日付毎のCSVをハッシュ・取得時刻付きで残し、取得し直す間隔を過ぎた日付だけ取得する
+    # 間隔は当日がDOWNLOAD_FRESHNESS_MINUTES分で、1日先になる毎に同じだけ延びる（上限DOWNLOAD_FRESHNESS_MAX_MINUTES分）
+    DOWNLOAD_INCREMENTAL: bool = False
+    DOWNLOAD_FRESHNESS_MINUTES: int = 30
+    DOWNLOAD_FRESHNESS_MAX_MINUTES: int = 720
+    # CSVの整形（pandas）を行うプロセス数（0ならスレッドで実行）
+    DOWNLOAD_PROCESS_WORKERS: int = 2
+    
+    # 受電履歴の保存先: "csv"（オペレーター別CSV）または "sqlite"
+    CALL_LOG_BACKEND: Literal["csv", "sqlite"] = "csv"
+    CALL_LOG_SQLITE_PATH: Path = BASE_DIR / "data" / "call_logs" / "call_logs.db"
+    
+    # 受電履歴: API外でのファイル変更を取り込む間隔（秒）
+    CALL_LOG_RECONCILE_SECONDS: float = 5.0
+    # 受電履歴の全文検索インデックスの保存先と、保存間隔（秒）
+    CALL_LOG_SEARCH_INDEX_PATH: Path = BASE_DIR / "data" / "call_logs" / "search_index.json"
+    CALL_LOG_SEARCH_SAVE_SECONDS: float = 30.0
+    # 受電履歴の書き込み: まとめて書き込むまでの待ち時間（秒）と1回の最大件数
+    CALL_LOG_COMMIT_WINDOW_SECONDS: float = 0.005
+    CALL_LOG_MAX_BATCH: int = 256
+    # Falseにすると fsync を省略（開発用。電源断時に直近の記録が失われる可能性あり）
+    CALL_LOG_FSYNC: bool = True
+    
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     
@@ -1,3 +1,6 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -8,14 +11,38 @@ from routers.training_search import router as training_search_router
 from routers.training_detail import router as training_detail_router
 from routers.trainee_detail import router as trainee_detail_router
 from routers.call_log import router as call_log_router
+from routers.monitoring import router as monitoring_router
+from service.browser_manager import browser_pool
+from service.call_log_service import call_log_service
+from service.http_fast_path import http_fast_path
+from service.prefetch_service import detail_prefetcher
 
 setup_logging()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(call_log_service.load)
+    call_log_service.start()
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        # 起動に失敗しても初回リクエスト時に再試行する
+        logger.error(f"ブラウザプールの起動に失敗しました: {e}")
+    detail_prefetcher.start()
+    yield
+    await detail_prefetcher.stop()
+    await http_fast_path.close()
+    await browser_pool.stop()
+    await call_log_service.stop()
+    await asyncio.to_thread(call_log_service.close)
 
 app = FastAPI(
     title="CallLog System API",
     description="研修管理システム API",
     version="1.0.0",
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan
 )
 
 app.include_router(auth_router, prefix="/api")
@@ -23,6 +50,7 @@ app.include_router(training_search_router, prefix="/api")
 app.include_router(training_detail_router, prefix="/api")
 app.include_router(trainee_detail_router, prefix="/api")
 app.include_router(call_log_router, prefix="/api")
+app.include_router(monitoring_router, prefix="/api")
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,6 +58,7 @@ app.add_middleware(
     allow_credentials=settings.CORS_CREDENTIALS,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"],
 )
 
 @app.get("/health")
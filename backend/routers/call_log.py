@@ -1,8 +1,14 @@
-from fastapi import APIRouter
+import asyncio
+import json
+from datetime import date
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
 import logging
-from schemas.call_log_schema import CallLogRequest, CallLogResponse
+from schemas.call_log_schema import CallLogRequest, CallLogResponse, CallLogSearchHit, CallLogStatsResponse
 from service.call_log_service import call_log_service
 from utils.error_handler import handle_api_errors
+from utils.http_cache import etag_matches
 
 logger = logging.getLogger(__name__)
 
@@ -24,14 +30,117 @@ async def save_call_log(call_log: CallLogRequest):
     logger.info(f"受電履歴保存結果: {result.success}")
     return result
 
+@router.get(
+    "/stats",
+    response_model=CallLogStatsResponse,
+    summary="受電履歴の集計",
+    description="期間内のオペレーター別・問合せ種別・回線種別・時間帯別の件数、平均対応時間、エスカレーション率を返します（未指定なら当月）"
+)
+@handle_api_errors
+async def get_call_log_stats(
+    date_from: Optional[date] = Query(None, description="集計の開始日（この日を含む）"),
+    date_to: Optional[date] = Query(None, description="集計の終了日（この日を含む）"),
+):
+    date_to = date_to or date.today()
+    date_from = date_from or date_to.replace(day=1)
+    if date_from > date_to:
+        raise ValueError("date_fromはdate_to以前の日付を指定してください")
+    if (date_to - date_from).days > 366:
+        raise ValueError("集計期間は1年以内で指定してください")
+
+    logger.info(f"受電履歴集計リクエスト: {date_from}〜{date_to}")
+    return await call_log_service.get_call_log_stats(date_from, date_to)
+
+@router.get(
+    "/search",
+    response_model=List[CallLogSearchHit],
+    summary="受電履歴の全文検索",
+    description="問合せ内容・対応内容・研修名・受講者名を全文検索し、関連度の高い順に返します。空白区切りの語は全て含むものに絞ります"
+)
+@handle_api_errors
+async def search_call_logs(
+    q: str = Query(..., min_length=2, description="検索語（2文字以上）"),
+    date_from: Optional[date] = Query(None, description="受電日時の開始日（この日を含む）"),
+    date_to: Optional[date] = Query(None, description="受電日時の終了日（この日を含む）"),
+    limit: int = Query(50, ge=1, le=500, description="取得件数"),
+):
+    logger.info(f"受電履歴全文検索リクエスト: q={q} {date_from}〜{date_to}")
+    result = await call_log_service.search_call_logs(
+        q,
+        date_from=date_from.isoformat() if date_from else None,
+        date_to=f"{date_to.isoformat()} 23:59:59" if date_to else None,
+        limit=limit,
+    )
+    logger.info(f"受電履歴全文検索結果: {len(result)}件")
+    return result
+
+async def _ndjson(batches):
+    async for rows in batches:
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+async def _single_batch(rows: list):
+    yield rows
+
 @router.get(
     "/list",
     summary="受電履歴取得",
-    description="マージされた受電履歴一覧を取得します"
+    description="マージされた受電履歴一覧を取得します。条件・並び順・件数を指定した場合はサーバー側で絞り込み、"
+                "続きがあればレスポンスヘッダー X-Next-Cursor のcursorで次ページを取得できます。"
+                "stream=trueでNDJSONを逐次返却します。受電履歴が変わっていなければ If-None-Match に対して304を返します"
 )
 @handle_api_errors
-async def get_call_logs():
-    logger.info("受電履歴取得リクエスト")
-    result = await call_log_service.get_merged_call_logs()
-    logger.info(f"受電履歴取得結果: {len(result)}件")
-    return result
\ No newline at end of file
+async def get_call_logs(
+    request: Request,
+    response: Response,
+    date_from: Optional[date] = Query(None, description="受電日時の開始日（この日を含む）"),
+    date_to: Optional[date] = Query(None, description="受電日時の終了日（この日を含む）"),
+    operator: Optional[str] = Query(None, description="オペレーター名"),
+    web_id: Optional[str] = Query(None, description="Web連携ID"),
+    status: Optional[str] = Query(None, description="完了状況"),
+    inquiry_type: Optional[str] = Query(None, description="問合せ種別"),
+    location: Optional[str] = Query(None, description="所在地"),
+    order: Literal["asc", "desc"] = Query("asc", description="受電日時の並び順"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="取得件数"),
+    cursor: Optional[str] = Query(None, description="前ページのX-Next-Cursor"),
+    stream: bool = Query(False, description="NDJSON（1行1件）で逐次返却する"),
+):
+    # ファイルの状態だけで判定し、変わっていなければ読み込まずに304
+    etag = f'"{await asyncio.to_thread(call_log_service.version)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    filters = {
+        'オペレーター名': operator,
+        'Web連携ID': web_id,
+        '完了状況': status,
+        '問合せ種別': inquiry_type,
+        '所在地': location,
+    }
+    if not any(v is not None for v in filters.values()) and not (date_from or date_to or limit or cursor) and order == "asc":
+        logger.info("受電履歴取得リクエスト")
+        if stream:
+            return StreamingResponse(
+                _ndjson(call_log_service.stream_call_logs()), media_type="application/x-ndjson", headers=headers
+            )
+        result = await call_log_service.get_merged_call_logs()
+        logger.info(f"受電履歴取得結果: {len(result)}件")
+        return result
+
+    logger.info(f"受電履歴検索リクエスト: {date_from}〜{date_to} {filters} order={order} limit={limit}")
+    result, next_cursor = await call_log_service.query_call_logs(
+        filters=filters,
+        date_from=date_from.isoformat() if date_from else None,
+        date_to=f"{date_to.isoformat()} 23:59:59" if date_to else None,
+        descending=order == "desc",
+        limit=limit,
+        cursor=cursor,
+    )
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+        response.headers["X-Next-Cursor"] = next_cursor
+    logger.info(f"受電履歴検索結果: {len(result)}件")
+    if stream:
+        return StreamingResponse(_ndjson(_single_batch(result)), media_type="application/x-ndjson", headers=headers)
+    return result
@@ -0,0 +1,29 @@
+# routers/monitoring.py
+
+import logging
+from fastapi import APIRouter
+from service.browser_manager import browser_pool
+from service.call_log_service import call_log_service
+from service.detail_cache import detail_cache, prefetch_cache
+from service.scheduler import browser_scheduler
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/monitoring",
+    tags=["monitoring"]
+)
+
+@router.get(
+    "/stats",
+    summary="稼働状況取得",
+    description="ブラウザ処理の待ち行列・待ち時間、ブラウザプール、詳細キャッシュ、受電履歴の統計を返します"
+)
+async def get_stats():
+    return {
+        "scheduler": browser_scheduler.stats(),
+        "browser_pool": browser_pool.stats(),
+        "detail_cache": detail_cache.stats(),
+        "prefetch_cache": prefetch_cache.stats(),
+        "call_log": call_log_service.stats(),
+    }
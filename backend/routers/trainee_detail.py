@@ -1,7 +1,7 @@
 # routers/trainee_detail.py
 
 import logging
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from utils.error_handler import handle_api_errors
 from schemas.trainee_detail_schema import TraineeDetailRequest, TraineeDetailResponse
 from service.trainee_detail_service import scrape_trainee_detail_handler
@@ -22,6 +22,7 @@ router = APIRouter(
 @handle_api_errors
 async def get_trainee_detail(
     application_id: str,
-    request: TraineeDetailRequest
+    request: TraineeDetailRequest,
+    refresh: bool = Query(False, description="キャッシュを使わず再取得する")
 ):
-    return await scrape_trainee_detail_handler(application_id, request.login_id, request.password)
+    return await scrape_trainee_detail_handler(application_id, request.login_id, request.password, refresh=refresh)
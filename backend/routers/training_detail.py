@@ -1,10 +1,11 @@
 # /routes/training_detail.py
 
 import logging
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
 from utils.error_handler import handle_api_errors
-from schemas.training_detail_schema import DetailRequest, DetailResponse
-from service.training_detail_service import scrape_detail_page
+from schemas.training_detail_schema import BatchDetailRequest, DetailRequest, DetailResponse
+from service.training_detail_service import scrape_detail_batch, scrape_detail_page
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +14,25 @@ router = APIRouter(
     tags=["Training Detail"]
 )
 
+@router.post(
+    "/batch",
+    summary="研修詳細情報の一括取得",
+    description="複数のWeb連携IDの詳細を1回のログインで取得し、取得できた順にNDJSONでストリーミング返却します。取得に失敗したIDはsuccess=falseの行として返します"
+)
+@handle_api_errors
+async def get_training_detail_batch(
+    data: BatchDetailRequest,
+    refresh: bool = Query(False, description="キャッシュを使わず再取得する")
+):
+    logger.info(f"詳細情報一括取得リクエスト: {len(data.web_ids)}件, login_id={data.login_id}")
+    items = await scrape_detail_batch(data.web_ids, data.login_id, data.password, refresh=refresh)
+
+    async def ndjson():
+        async for item in items:
+            yield item.model_dump_json() + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
 @router.post(
     "/{web_id}",
     response_model=DetailResponse,
@@ -20,8 +40,12 @@ router = APIRouter(
     description="Web連携IDを元に、研修の基本情報と受講者一覧を取得します"
 )
 @handle_api_errors
-async def get_training_detail(web_id: str, data: DetailRequest):
-    logger.info(f"詳細情報取得リクエスト: web_id={web_id}, login_id={data.login_id}")
-    result = await scrape_detail_page(web_id, data.login_id, data.password)
+async def get_training_detail(
+    web_id: str,
+    data: DetailRequest,
+    refresh: bool = Query(False, description="キャッシュを使わず再取得する")
+):
+    logger.info(f"詳細情報取得リクエスト: web_id={web_id}, login_id={data.login_id}, refresh={refresh}")
+    result = await scrape_detail_page(web_id, data.login_id, data.password, refresh=refresh)
     logger.info(f"詳細情報取得成功: web_id={web_id}")
     return result
@@ -1,11 +1,14 @@
 # routers/training_search.py
 
+import asyncio
 import logging
-from datetime import datetime
-from pathlib import Path
-import csv
-from fastapi import APIRouter
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import JSONResponse
+from service.training_dataset import training_dataset_cache
 from utils.error_handler import handle_api_errors
+from utils.http_cache import etag_matches
 
 logger = logging.getLogger(__name__)
 
@@ -17,28 +20,35 @@ router = APIRouter(
 @router.get(
     "/csv",
     summary="研修CSV取得",
-    description="当日マージされたWEBinsourceの研修CSVを取得します。コードが短く、再利用もしないためservice分割なし"
+    description="当日マージされたWEBinsourceの研修CSVを取得します。読み込み結果とJSON（gzip済み）はファイルが更新されるまで使い回し、変わっていなければ If-None-Match に対して304を返します。"
+                "絞り込み条件を指定した場合は読み込み時に作ったインデックスで検索し、一致した件数を X-Total-Count で返します"
 )
 @handle_api_errors
-async def get_training_csv():
-    today_str = datetime.now().strftime("%y%m%d")
-    file_path = Path(__file__).resolve().parent.parent / "downloads" / f"{today_str}_webinsource_merged.csv"
+async def get_training_csv(
+    request: Request,
+    web_id: Optional[str] = Query(None, description="Web連携ID（完全一致）"),
+    date_from: Optional[date] = Query(None, description="開催日の開始（この日を含む）"),
+    date_to: Optional[date] = Query(None, description="開催日の終了（この日を含む）"),
+    venue: Optional[str] = Query(None, description="会場名（完全一致・全角/半角は区別しない）"),
+    room: Optional[str] = Query(None, description="ROOM（完全一致・全角/半角は区別しない）"),
+    instructor: Optional[str] = Query(None, description="講師（完全一致・全角/半角は区別しない）"),
+    q: Optional[str] = Query(None, description="研修名・ふりがなの部分一致（空白区切りで全てを含む）"),
+    offset: int = Query(0, ge=0, description="先頭から読み飛ばす件数"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="1ページの件数（未指定なら全件）"),
+):
+    # 当日のCSVが無い場合は空配列
+    dataset = await asyncio.to_thread(training_dataset_cache.get)
+    headers = {"ETag": dataset.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), dataset.etag):
+        return Response(status_code=304, headers=headers)
 
-    if not file_path.exists():
-        logger.warning(f"当日のCSVファイルが存在しません: {file_path}")
-        return []  # 空配列を返す
+    filters = dict(web_id=web_id, date_from=date_from, date_to=date_to, venue=venue, room=room, instructor=instructor, q=q)
+    if any(v is not None for v in filters.values()) or offset or limit:
+        rows, total = dataset.search(**filters, offset=offset, limit=limit)
+        headers["X-Total-Count"] = str(total)
+        return JSONResponse(content=rows, headers=headers)
 
-    try:
-        with open(file_path, encoding="cp932") as f:
-            reader = csv.DictReader(f)
-            data = list(reader)
-            
-            # 受電履歴列を追加（フロントエンドで使用）
-            for row in data:
-                row["受電履歴"] = ""  # 空文字列、フロントエンドでボタンとして表示
-            
-            logger.info(f"CSV data loaded: {len(data)} records from {file_path.name}")
-            return data
-    except Exception as e:
-        logger.error(f"CSV読み込みエラー: {e}")
-        return []
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=dataset.gzip_bytes, media_type="application/json", headers=headers)
+    return Response(content=dataset.json_bytes, media_type="application/json", headers=headers)
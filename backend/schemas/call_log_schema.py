@@ -1,6 +1,19 @@
 from pydantic import BaseModel, validator
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import Dict, Optional
+
+# 受電履歴CSVの列（オペレーター別CSV・back office用のマージファイル共通）
+CALL_LOG_HEADERS = [
+    '受電日時', '開始時間', '完了時間', 'オペレーター名', 
+    '回線種別', '問合せ種別', '所在地', '関連項目',
+    '研修名', '研修日', 'Web連携ID', 
+    '受講者名', '電話番号', 'メールアドレス',
+    '問合せ内容', '対応内容', '二次対応時間', '完了状況'
+]
+# オペレーター別CSVの末尾列。全ワーカーを通して単調増加する連番（列追加前の行は空）
+# back office用のマージファイルは従来の形式のまま（この列は書き出さない）
+SEQUENCE_HEADER = '連番'
+OPERATOR_FILE_HEADERS = CALL_LOG_HEADERS + [SEQUENCE_HEADER]
 
 class CallLogRequest(BaseModel):
     # 時刻系フィールド
@@ -61,4 +74,23 @@ class CallLogRequest(BaseModel):
 
 class CallLogResponse(BaseModel):
     success: bool
-    message: str = ""
\ No newline at end of file
+    message: str = ""
+
+class CallLogStatsResponse(BaseModel):
+    date_from: date
+    date_to: date
+    total: int
+    by_day: Dict[str, int]  # 日付 -> 件数
+    by_operator: Dict[str, int]
+    by_inquiry_type: Dict[str, int]
+    by_line_type: Dict[str, int]
+    by_hour: Dict[str, int]  # 受電時刻の時（00〜23） -> 件数
+    by_status: Dict[str, int]
+    average_handle_seconds: Optional[float] = None  # 開始時間〜完了時間の平均秒数
+    average_handle_seconds_by_operator: Dict[str, float]
+    escalations: int
+    escalation_rate: Optional[float] = None
+
+class CallLogSearchHit(BaseModel):
+    score: float
+    record: Dict[str, Optional[str]]
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Optional
 
 class DetailRequest(BaseModel):
     login_id: str
@@ -22,3 +23,15 @@ class Attendee(BaseModel):
 class DetailResponse(BaseModel):
     基本情報: dict
     受講者一覧: list[Attendee]
+
+
+class BatchDetailRequest(BaseModel):
+    login_id: str
+    password: str
+    web_ids: list[str] = Field(..., min_length=1, max_length=200)
+
+class BatchDetailItem(BaseModel):
+    web_id: str
+    success: bool
+    data: Optional[DetailResponse] = None
+    error: Optional[str] = None
@@ -1,12 +1,15 @@
 import logging
 from schemas.auth_schema import LoginRequest, LoginResponse
-from service.browser_manager import BrowserManager
+from service.browser_manager import BrowserManager, browser_manager
+from service.credential_cache import CredentialCache, credential_cache
+from utils.error_handler import ServiceOverloadedError
 
 logger = logging.getLogger(__name__)
 
 class AuthService:
-    def __init__(self, browser_manager: BrowserManager):
+    def __init__(self, browser_manager: BrowserManager, credentials: CredentialCache):
         self.browser_manager = browser_manager
+        self.credentials = credentials
 
     async def handle_login(self, data: LoginRequest, staff_map: dict) -> LoginResponse:
         login_id = data.id
@@ -17,8 +20,15 @@ class AuthService:
             raise ValueError("未登録のIDです")
 
         logger.info(f"ログイン試行: {login_id}")
+
+        # 確認済みの認証情報ならブラウザを起動しない
+        if self.credentials.verify(login_id, password):
+            full_name = staff_map[login_id]
+            logger.info(f"ログイン成功（確認済み認証情報）: {login_id} / {full_name}")
+            return LoginResponse(success=True, fullName=full_name)
         
         try:
+            # ログインで得たセッションはセッションキャッシュに引き継がれ、以降の詳細取得で再利用される
             async with self.browser_manager.get_authenticated_page(login_id, password) as page:
                 full_name = staff_map[login_id]
                 logger.info(f"ログイン成功: {login_id} / {full_name}")
@@ -26,8 +36,11 @@ class AuthService:
         except ValueError as e:
             logger.warning(f"認証エラー: {login_id} - {e}")
             raise e
+        except ServiceOverloadedError:
+            # 混雑時は429（Retry-After付き）で返す
+            raise
         except Exception as e:
             logger.error(f"ログイン処理エラー: {login_id} - {e}")
             raise ValueError("ログイン処理中にエラーが発生しました")
 
-auth_service = AuthService(BrowserManager())
+auth_service = AuthService(browser_manager, credential_cache)
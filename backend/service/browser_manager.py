@@ -1,36 +1,189 @@
+import asyncio
 from contextlib import asynccontextmanager
-from playwright.async_api import async_playwright, Browser, Page, TimeoutError
+from typing import AsyncIterator, Optional
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright, TimeoutError
 from config.settings import settings
+from service.credential_cache import CredentialCache, credential_cache
+from service.page_extractor import is_session_expired
+from service.resource_blocker import ResourceBlocker, resource_blocker
+from service.scheduler import PRIORITY_NORMAL, BrowserScheduler, browser_scheduler
+from service.session_cache import SessionCache, session_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
+class BrowserPool:
+    """常駐Chromiumを保持し、リクエスト毎に独立したBrowserContextを払い出す"""
+
+    def __init__(self, max_contexts: int, max_uses: int, blocker: ResourceBlocker, headless: bool = True):
+        self.max_contexts = max_contexts
+        self.max_uses = max_uses
+        self.blocker = blocker
+        self.headless = headless
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._uses = 0
+        # ブラウザ別の使用中コンテキスト数（退役済みブラウザも0になるまで保持）
+        self._active: dict = {}
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_contexts)
+
+    async def start(self):
+        """Playwrightとブラウザを起動（lifespanから呼び出し）"""
+        async with self._lock:
+            await self._ensure_browser()
+        logger.info(f"Browser pool started: max_contexts={self.max_contexts}, max_uses={self.max_uses}")
+
+    async def stop(self):
+        """全ブラウザとPlaywrightを停止"""
+        async with self._lock:
+            for browser in list(self._active):
+                await self._close_browser(browser)
+            self._active.clear()
+            self._browser = None
+            if self._playwright:
+                await self._playwright.stop()
+                self._playwright = None
+        logger.info("Browser pool stopped")
+
+    def stats(self) -> dict:
+        """プールの稼働状況"""
+        return {
+            "max_contexts": self.max_contexts,
+            "active_contexts": sum(self._active.values()),
+            "browsers": len(self._active),
+            "uses": self._uses,
+            "resource_blocking": self.blocker.totals.to_dict(),
+        }
+
+    @asynccontextmanager
+    async def context(self, block_resources: bool = True, **context_options) -> AsyncIterator[BrowserContext]:
+        """独立したBrowserContextを払い出し、終了時に破棄する"""
+        async with self._semaphore:
+            browser = await self._acquire_browser()
+            context = None
+            block_stats = None
+            try:
+                context = await browser.new_context(**context_options)
+                if block_resources:
+                    block_stats = await self.blocker.attach(context)
+                yield context
+            finally:
+                if block_stats:
+                    self.blocker.report(block_stats)
+                if context:
+                    try:
+                        await context.close()
+                    except Exception as e:
+                        logger.debug(f"Context close failed: {e}")
+                await self._release_browser(browser)
+
+    async def _ensure_browser(self) -> Browser:
+        """ロック取得済み前提。未起動・クラッシュ・使用回数超過時にブラウザを起動し直す"""
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+
+        if self._browser is not None and not self._browser.is_connected():
+            logger.warning("Browser disconnected, relaunching")
+            self._active.pop(self._browser, None)
+            self._browser = None
+        elif self._browser is not None and self._uses >= self.max_uses:
+            logger.info(f"Browser reached {self._uses} uses, recycling")
+            retired = self._browser
+            self._browser = None
+            if self._active.get(retired, 0) <= 0:
+                self._active.pop(retired, None)
+                await self._close_browser(retired)
+
+        if self._browser is None:
+            self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            self._active[self._browser] = 0
+            self._uses = 0
+        return self._browser
+
+    async def _acquire_browser(self) -> Browser:
+        async with self._lock:
+            browser = await self._ensure_browser()
+            self._uses += 1
+            self._active[browser] += 1
+            return browser
+
+    async def _release_browser(self, browser: Browser):
+        async with self._lock:
+            if browser not in self._active:
+                return
+            self._active[browser] -= 1
+            if browser is not self._browser and self._active[browser] <= 0:
+                self._active.pop(browser)
+                await self._close_browser(browser)
+
+    async def _close_browser(self, browser: Browser):
+        try:
+            if browser.is_connected():
+                await browser.close()
+        except Exception as e:
+            logger.debug(f"Browser close failed: {e}")
+
 class BrowserManager:
+    def __init__(self, pool: BrowserPool, scheduler: BrowserScheduler, sessions: SessionCache, credentials: CredentialCache):
+        self.pool = pool
+        self.scheduler = scheduler
+        self.sessions = sessions
+        self.credentials = credentials
+
     @asynccontextmanager
-    async def get_authenticated_page(self, login_id: str, password: str):
-        playwright = None
-        browser = None
+    async def get_authenticated_page(
+        self,
+        login_id: str,
+        password: str,
+        url: Optional[str] = None,
+        timeout: Optional[float] = None,
+        priority: int = PRIORITY_NORMAL,
+        batch: bool = False,
+        **context_options
+    ):
+        """ログイン済みページを取得。キャッシュ済みセッションがあればログインを省略してurlへ直行する
+
+        ブラウザを使う前にスケジューラで実行枠を確保する（timeoutは枠を待てる秒数、batchは複数ページで使う枠）。
+        """
         try:
-            playwright = await async_playwright().start()
-            browser = await playwright.chromium.launch(headless=True)
-            context = await browser.new_context()
-            page = await context.new_page()
-            
-            success = await self._login_to_webinsource(page, login_id, password)
-            if not success:
-                raise ValueError("WebInsourceへのログインに失敗しました")
-            
-            yield page
-            
+            async with self.scheduler.slot(login_id, timeout=timeout, priority=priority, batch=batch):
+                state = self.sessions.get(login_id, password)
+                async with self.pool.context(storage_state=state, **context_options) as context:
+                    page = await context.new_page()
+
+                    if state is None:
+                        await self._login(page, login_id, password)
+
+                    if url:
+                        await page.goto(url, wait_until="load", timeout=30000)
+                        if state is not None and await is_session_expired(page):
+                            # セッション切れは一度だけ透過的に再ログイン
+                            logger.info(f"Cached session expired, re-login: {login_id}")
+                            self.sessions.invalidate(login_id, password)
+                            await self._login(page, login_id, password)
+                            await page.goto(url, wait_until="load", timeout=30000)
+
+                    yield page
+
         except Exception as e:
             logger.error(f"Browser error: {e}")
             raise
-        finally:
-            if browser:
-                await browser.close()
-            if playwright:
-                await playwright.stop()
-    
+
+    async def relogin(self, page: Page, login_id: str, password: str):
+        """セッション切れを検知したコンテキストで再ログインし、キャッシュ済みセッションを差し替える"""
+        self.sessions.invalidate(login_id, password)
+        await self._login(page, login_id, password)
+
+    async def _login(self, page: Page, login_id: str, password: str):
+        """ログインしてセッションと確認済み認証情報をキャッシュへ保存"""
+        success = await self._login_to_webinsource(page, login_id, password)
+        if not success:
+            self.credentials.invalidate(login_id)
+            raise ValueError("WebInsourceへのログインに失敗しました")
+        self.credentials.remember(login_id, password)
+        self.sessions.put(login_id, password, await page.context.storage_state())
+
     async def _login_to_webinsource(self, page: Page, login_id: str, password: str) -> bool:
         try:
             await page.goto(settings.WEBINSOURCE_TOP_URL)
@@ -46,4 +199,12 @@ class BrowserManager:
             return False
         except Exception as e:
             logger.error(f"[Login Error] ログイン中にエラー発生: {e}")
-            return False
\ No newline at end of file
+            return False
+
+browser_pool = BrowserPool(
+    max_contexts=settings.BROWSER_MAX_CONTEXTS,
+    max_uses=settings.BROWSER_MAX_USES,
+    blocker=resource_blocker,
+    headless=settings.BROWSER_HEADLESS,
+)
+browser_manager = BrowserManager(browser_pool, browser_scheduler, session_cache, credential_cache)
@@ -0,0 +1,192 @@
+# service/call_log_partitions.py
+
+import csv
+import fcntl
+import glob
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from service.csv_tail import read_appended_rows
+
+logger = logging.getLogger(__name__)
+
+# 受電日時の月毎に call_logs/YYYY-MM/operator_*.csv へ分割して保存する。
+# 締めた月（当月より前）には manifest.json（件数・受電日時の最小/最大・各ファイルのサイズ）を置き、
+# 期間指定の処理はCSVを開かずに対象外の月を除外できるようにする。
+
+MANIFEST_NAME = "manifest.json"
+LEGACY_BACKUP_DIR = "legacy"
+_MONTH_PATTERN = re.compile(r"^\d{4}-\d{2}$")
+
+def current_partition() -> str:
+    return datetime.now().strftime("%Y-%m")
+
+def partition_of(received_at: str) -> str:
+    """受電日時（YYYY-MM-DD HH:MM:SS）が属する月"""
+    month = (received_at or "")[:7]
+    return month if _MONTH_PATTERN.match(month) else current_partition()
+
+def partition_bounds(month: str) -> tuple[str, str]:
+    """月に含まれうる受電日時の範囲（文字列比較用）"""
+    return f"{month}-01", f"{month}-31 23:59:59"
+
+def partition_of_file(file_path) -> Optional[str]:
+    """パーティション内のファイルなら月、旧形式（call_logs直下）ならNone"""
+    month = Path(file_path).parent.name
+    return month if _MONTH_PATTERN.match(month) else None
+
+def list_partitions(data_dir: Path) -> list[str]:
+    return sorted(
+        entry.name for entry in os.scandir(data_dir)
+        if entry.is_dir() and _MONTH_PATTERN.match(entry.name)
+    ) if data_dir.exists() else []
+
+def partition_files(data_dir: Path, month: str) -> list[str]:
+    return sorted(glob.glob(str(data_dir / month / "operator_*.csv")))
+
+def legacy_files(data_dir: Path) -> list[str]:
+    """分割前の call_logs/operator_*.csv（移行前の互換用）"""
+    return sorted(glob.glob(str(data_dir / "operator_*.csv")))
+
+def all_operator_files(data_dir: Path) -> list[str]:
+    files = legacy_files(data_dir)
+    for month in list_partitions(data_dir):
+        files.extend(partition_files(data_dir, month))
+    return files
+
+def _file_signatures(files: list) -> dict:
+    signatures = {}
+    for file_path in files:
+        stat = os.stat(file_path)
+        signatures[Path(file_path).name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return signatures
+
+def load_manifest(data_dir: Path, month: str) -> Optional[dict]:
+    """有効なマニフェスト（記録後にファイルが変わっていないもの）を返す。無ければNone"""
+    manifest_path = data_dir / month / MANIFEST_NAME
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("files") != _file_signatures(partition_files(data_dir, month)):
+            logger.info(f"Call log partition changed after sealing: {month}")
+            return None
+        return manifest
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Invalid call log partition manifest {manifest_path}: {e}")
+        return None
+
+def seal_partition(data_dir: Path, month: str, encoding: str = "cp932") -> dict:
+    """締めた月の件数・受電日時の最小/最大を集計してマニフェストを書く"""
+    files = partition_files(data_dir, month)
+    count, min_received, max_received = 0, None, None
+    for file_path in files:
+        rows, _, _ = read_appended_rows(Path(file_path), 0, encoding)
+        for row in rows:
+            received_at = row[0] if row else ''
+            count += 1
+            min_received = received_at if min_received is None else min(min_received, received_at)
+            max_received = received_at if max_received is None else max(max_received, received_at)
+
+    manifest = {
+        "month": month,
+        "rows": count,
+        "min_received": min_received,
+        "max_received": max_received,
+        "files": _file_signatures(files),
+        "sealed_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    manifest_path = data_dir / month / MANIFEST_NAME
+    temp_file = manifest_path.with_suffix(".tmp")
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    temp_file.replace(manifest_path)
+    logger.info(f"Call log partition sealed: {month} ({count} records)")
+    return manifest
+
+def unseal_partition(data_dir: Path, month: str):
+    """締めた月に遅れて書き込む前にマニフェストを外す"""
+    try:
+        os.remove(data_dir / month / MANIFEST_NAME)
+        logger.info(f"Call log partition unsealed: {month}")
+    except FileNotFoundError:
+        pass
+
+def seal_closed_partitions(data_dir: Path) -> list[str]:
+    """当月より前でマニフェストが無い（または無効な）月を締める"""
+    sealed = []
+    current = current_partition()
+    for month in list_partitions(data_dir):
+        if month < current and load_manifest(data_dir, month) is None:
+            seal_partition(data_dir, month)
+            sealed.append(month)
+    return sealed
+
+def partitions_in_range(data_dir: Path, date_from: Optional[str], date_to: Optional[str]) -> list[str]:
+    """受電日時の範囲と重なる月（締めた月はマニフェストの最小/最大で判定）"""
+    months = []
+    for month in list_partitions(data_dir):
+        low, high = partition_bounds(month)
+        manifest = load_manifest(data_dir, month) if month < current_partition() else None
+        if manifest is not None:
+            if not manifest["rows"]:
+                continue
+            low, high = manifest["min_received"], manifest["max_received"]
+        if date_from and high < date_from:
+            continue
+        if date_to and low > date_to:
+            continue
+        months.append(month)
+    return months
+
+def migrate_legacy_files(data_dir: Path, headers: list, encoding: str = "cp932") -> dict:
+    """call_logs直下の operator_*.csv を月毎のパーティションへ移し、元ファイルは legacy/ に退避する
+
+    APIを停止した状態で実行する。戻り値は 月 -> 移した件数。
+    """
+    migrated: dict = {}
+    backup_dir = data_dir / LEGACY_BACKUP_DIR
+    for file_path in legacy_files(data_dir):
+        rows, _, _ = read_appended_rows(Path(file_path), 0, encoding)
+        by_month: dict = {}
+        for row in rows:
+            by_month.setdefault(partition_of(row[0] if row else ''), []).append(row)
+
+        for month, month_rows in by_month.items():
+            target = data_dir / month / Path(file_path).name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with open(target, "a", newline="", encoding=encoding) as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    writer = csv.writer(f)
+                    if os.fstat(f.fileno()).st_size == 0:
+                        writer.writerow(headers)
+                    writer.writerows(sorted(month_rows, key=lambda r: r[0] if r else ''))
+                    f.flush()
+                    os.fsync(f.fileno())
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            unseal_partition(data_dir, month)
+            migrated[month] = migrated.get(month, 0) + len(month_rows)
+
+        backup_dir.mkdir(exist_ok=True)
+        os.replace(file_path, backup_dir / Path(file_path).name)
+        logger.info(f"Migrated {len(rows)} call logs from {file_path}")
+
+    seal_closed_partitions(data_dir)
+    return migrated
+
+if __name__ == "__main__":
+    # python -m service.call_log_partitions  （backendディレクトリで実行）
+    from config.settings import settings
+    from schemas.call_log_schema import OPERATOR_FILE_HEADERS
+
+    logging.basicConfig(level=logging.INFO)
+    result = migrate_legacy_files(settings.BASE_DIR / "data" / "call_logs", OPERATOR_FILE_HEADERS)
+    for month, count in sorted(result.items()):
+        print(f"{month}: {count}件")
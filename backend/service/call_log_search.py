@@ -0,0 +1,200 @@
+# service/call_log_search.py
+
+import json
+import logging
+import os
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+
+# 検索対象の列と、一致した時の重み
+SEARCH_FIELDS = {
+    '問合せ内容': 2.0,
+    '対応内容': 1.0,
+    '研修名': 1.5,
+    '受講者名': 3.0,
+}
+
+def normalize(text: str) -> str:
+    """全角/半角・大文字/小文字の違いを吸収"""
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+def ngrams(text: str, n: int) -> set:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+class CallLogSearchIndex:
+    """受電履歴の文字n-gram転置インデックス（外部の検索サービスを使わない全文検索）
+
+    - 元データ（ファイル・DB）毎に読み込み済みの位置を持ち、保存時・起動時は追加分だけを索引する
+    - 索引はディスクに保存し、起動時に全件をn-gram分割し直さない
+    - n-gramで候補を絞った後、正規化した本文に検索語が含まれるかを確認して順位を付ける
+    """
+
+    def __init__(self, index_path: Path, headers: list, n: int = 2):
+        self.index_path = index_path
+        self.headers = headers
+        self.n = n
+        # 文書ID -> 行（削除済みはNone）
+        self._docs: list = []
+        # n-gram -> 文書IDの昇順リスト
+        self._postings: dict = {}
+        # 元データのキー -> {"inode", "offset", "doc_ids"}
+        self._sources: dict = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._last_saved = time.monotonic()
+
+    def _text(self, row: dict) -> str:
+        return "\n".join(normalize(row.get(field)) for field in SEARCH_FIELDS)
+
+    def _add(self, row: dict) -> int:
+        doc_id = len(self._docs)
+        self._docs.append(row)
+        for gram in ngrams(self._text(row), self.n):
+            self._postings.setdefault(gram, []).append(doc_id)
+        return doc_id
+
+    def source_state(self, source: str) -> Optional[tuple]:
+        """(inode, 索引済みの位置)。未登録ならNone"""
+        with self._lock:
+            state = self._sources.get(source)
+            return (state["inode"], state["offset"]) if state else None
+
+    def add_rows(self, source: str, rows: list, offset: int, inode=None):
+        """元データの追加分を索引し、索引済みの位置を進める"""
+        with self._lock:
+            state = self._sources.setdefault(source, {"inode": inode, "offset": 0, "doc_ids": []})
+            state["inode"] = inode
+            state["offset"] = offset
+            state["doc_ids"].extend(self._add(row) for row in rows)
+            self._dirty = True
+
+    def reset_source(self, source: str):
+        """置換・書き換えられた元データの文書を削除扱いにする"""
+        with self._lock:
+            state = self._sources.pop(source, None)
+            if state is None:
+                return
+            for doc_id in state["doc_ids"]:
+                self._docs[doc_id] = None
+            self._dirty = True
+
+    def sources(self) -> list:
+        with self._lock:
+            return list(self._sources)
+
+    def search(self, query: str, date_from: Optional[str] = None, date_to: Optional[str] = None, limit: int = 50) -> list:
+        """空白区切りの全ての語を含む行を、一致数×列の重みの高い順（同点は新しい順）で返す"""
+        terms = [term for term in normalize(query).split() if term]
+        if not terms:
+            return []
+        if any(len(term) < self.n for term in terms):
+            raise ValueError(f"検索語は{self.n}文字以上で指定してください")
+
+        with self._lock:
+            grams = set().union(*(ngrams(term, self.n) for term in terms))
+            postings = [self._postings.get(gram) for gram in grams]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for ids in postings[1:]:
+                candidates.intersection_update(ids)
+                if not candidates:
+                    return []
+            docs = [self._docs[doc_id] for doc_id in candidates]
+
+        hits = []
+        for row in docs:
+            if row is None:
+                continue
+            received_at = row.get('受電日時') or ''
+            if (date_from and received_at < date_from) or (date_to and received_at > date_to):
+                continue
+
+            score = 0.0
+            matched_all = True
+            for term in terms:
+                term_score = sum(
+                    normalize(row.get(field)).count(term) * weight
+                    for field, weight in SEARCH_FIELDS.items()
+                )
+                if term_score == 0:
+                    # n-gramは全て含むが、語として連続していない
+                    matched_all = False
+                    break
+                score += term_score
+            if matched_all:
+                hits.append((score, received_at, row))
+
+        hits.sort(key=lambda hit: (hit[0], hit[1]), reverse=True)
+        return [{"score": score, "record": row} for score, _, row in hits[:limit]]
+
+    def load(self) -> bool:
+        """保存済みの索引を読み込む。使えない場合はFalse（空の索引から作り直す）"""
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_FORMAT_VERSION or data.get("n") != self.n or data.get("headers") != self.headers:
+                logger.info("Search index format changed, rebuilding")
+                return False
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Failed to load search index {self.index_path}: {e}")
+            return False
+
+        deleted = sum(1 for values in data["docs"] if values is None)
+        if deleted * 2 > len(data["docs"]):
+            # 削除済みの文書が半分を超えたら作り直して詰める
+            logger.info(f"Search index has {deleted} deleted documents, rebuilding")
+            return False
+
+        with self._lock:
+            self._docs = [dict(zip(self.headers, values)) if values is not None else None for values in data["docs"]]
+            self._postings = data["postings"]
+            self._sources = data["sources"]
+            self._dirty = False
+        logger.info(f"Search index loaded: {len(self._docs)} documents, {len(self._postings)} grams")
+        return True
+
+    def save(self, min_interval: float = 0.0):
+        """変更があれば一時ファイル経由で保存（min_interval秒以内の再保存はしない）"""
+        with self._lock:
+            if not self._dirty or time.monotonic() - self._last_saved < min_interval:
+                return
+            data = {
+                "version": INDEX_FORMAT_VERSION,
+                "n": self.n,
+                "headers": self.headers,
+                "docs": [[row.get(h) for h in self.headers] if row is not None else None for row in self._docs],
+                "postings": self._postings,
+                "sources": self._sources,
+            }
+            serialized = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+            self._dirty = False
+            self._last_saved = time.monotonic()
+
+        temp_file = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(temp_file, "w", encoding="utf-8") as f:
+                f.write(serialized)
+            os.replace(temp_file, self.index_path)
+        except Exception as e:
+            self._dirty = True
+            logger.error(f"Failed to save search index: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "documents": sum(1 for row in self._docs if row is not None),
+                "deleted": sum(1 for row in self._docs if row is None),
+                "grams": len(self._postings),
+                "sources": len(self._sources),
+            }
@@ -1,17 +1,29 @@
 import csv
 import os
-import glob
 import fcntl
+import heapq
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime
+from typing import Optional
 import logging
 import asyncio
 import threading
-from schemas.call_log_schema import CallLogRequest, CallLogResponse
+from schemas.call_log_schema import CALL_LOG_HEADERS, OPERATOR_FILE_HEADERS, SEQUENCE_HEADER, CallLogRequest, CallLogResponse
 from config.settings import settings
+from service import call_log_partitions as partitions
+from service.call_log_search import CallLogSearchIndex
+from service.call_log_stats import CallLogStats
+from service.call_log_store import CallLogStore
+from service.call_log_writer import CallLogWriter
+from service.process_coordination import SequenceAllocator, WriterElection
+from service.csv_tail import read_appended_rows
 
 logger = logging.getLogger(__name__)
 
+def _row_key(row: list) -> str:
+    """受電日時（先頭列）でソート"""
+    return row[0] if row else ''
+
 class CallLogService:
     def __init__(self):
         self.data_dir = settings.BASE_DIR / "data" / "call_logs"
@@ -19,120 +31,311 @@ class CallLogService:
         self._ensure_directories_exist()
         # マージ処理の排他制御用ロック
         self._merge_lock = threading.Lock()
-        # ファイル書き込み用ロック（オペレーター別）
-        self._write_locks = {}
+        # 差分マージ用: ファイル毎の (inode, 読み取り済みバイト位置)。Noneなら未マージ
+        self._merge_offsets = None
+        self._merged_last_key = ''
+        self._merge_pending = False
+        self._background_tasks = set()
+        self._maintenance_task: Optional[asyncio.Task] = None
+        # 締め処理を済ませた月（この月より前は締め済み）
+        self._sealed_through = None
+        # /call-log/list 用のメモリ上の受電履歴
+        self.store = CallLogStore(self.data_dir, OPERATOR_FILE_HEADERS, settings.CALL_LOG_RECONCILE_SECONDS)
+        # /call-log/stats 用の日別集計（保存時に加算、月単位でメモリ上の受電履歴から作り直す）
+        self.aggregates = CallLogStats(self.store.rows_in_month, lock=self.store.lock)
+        self.store.listeners.append(self.aggregates)
+        # uvicorn --workers で複数プロセスになっても、マージファイル・締め処理・検索インデックスの保存は
+        # ロックファイルを取れた1プロセスだけが行う（オペレーター別CSVへの追記は各プロセスがファイルロックで直列化）
+        self.election = WriterElection(self.data_dir / ".writer.lock")
+        self.sequence = SequenceAllocator(self.data_dir / ".sequence", fsync=settings.CALL_LOG_FSYNC)
+        # オペレーター別CSVへの追記（専用スレッドでまとめて書き込み）
+        self.writer = CallLogWriter(
+            headers=OPERATOR_FILE_HEADERS,
+            commit_window_seconds=settings.CALL_LOG_COMMIT_WINDOW_SECONDS,
+            max_batch=settings.CALL_LOG_MAX_BATCH,
+            fsync=settings.CALL_LOG_FSYNC,
+            on_append=self._on_append,
+            sequence=self.sequence,
+        )
+        # /call-log/search 用の全文検索インデックス
+        self.search_index = CallLogSearchIndex(settings.CALL_LOG_SEARCH_INDEX_PATH, OPERATOR_FILE_HEADERS)
+        # 索引済み位置の確認〜ファイルの読み込み〜索引への追加を1つの操作にする（同じ範囲を二重に索引しないように）
+        self._search_sync_lock = threading.Lock()
     
     def _ensure_directories_exist(self):
         """ディレクトリが存在しない場合は作成"""
         self.data_dir.mkdir(parents=True, exist_ok=True)
         logger.info(f"Call log directory ensured: {self.data_dir}")
     
-    def _get_operator_file_path(self, operator_name: str) -> Path:
-        """オペレーター別ファイルパスを取得"""
+    def _get_operator_file_path(self, operator_name: str, month: str) -> Path:
+        """受電月・オペレーター別ファイルパスを取得"""
         # ファイル名に使えない文字を置換
         safe_name = "".join(c for c in operator_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
         safe_name = safe_name.replace(' ', '_')
-        return self.data_dir / f"operator_{safe_name}.csv"
+        partition_dir = self.data_dir / month
+        partition_dir.mkdir(exist_ok=True)
+        return partition_dir / f"operator_{safe_name}.csv"
     
-    def _get_write_lock(self, operator_name: str) -> threading.Lock:
-        """オペレーター別書き込みロックを取得"""
-        if operator_name not in self._write_locks:
-            self._write_locks[operator_name] = threading.Lock()
-        return self._write_locks[operator_name]
+    def load(self):
+        """起動時にオペレーター別CSVをメモリへ読み込み、検索インデックスを最新化（担当プロセスは締め処理・マージも行う）"""
+        self.election.try_acquire()
+        if self.election.is_leader:
+            self._seal_closed_partitions()
+        self.store.load()
+        self._restore_sequence()
+        self._merge_files()
+        self.search_index.load()
+        self._sync_search_index()
+
+    def _restore_sequence(self):
+        """連番のカウンタファイルが失われていても、読み込んだ行の連番より後から払い出す"""
+        last = 0
+        for row in self.store.all_rows():
+            value = row.get(SEQUENCE_HEADER) or ''
+            if value.isdigit():
+                last = max(last, int(value))
+        self.sequence.ensure_at_least(last)
+
+    def start(self):
+        """lifespanから起動。担当プロセスの選出と、他プロセスが追記した分のマージを定期的に行う"""
+        self._maintenance_task = asyncio.create_task(self._maintain())
+
+    async def stop(self):
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+            self._maintenance_task = None
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(settings.CALL_LOG_RECONCILE_SECONDS)
+            try:
+                # 担当プロセスが終了していれば引き継ぐ
+                if self.election.try_acquire():
+                    await self._merge_all_files()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Call log maintenance failed: {e}")
+
+    def _seal_closed_partitions(self):
+        """月替わり後に前月以前のパーティションを締める（月に1回だけ走査）"""
+        current = partitions.current_partition()
+        if self._sealed_through == current:
+            return
+        try:
+            partitions.seal_closed_partitions(self.data_dir)
+            self._sealed_through = current
+        except Exception as e:
+            logger.error(f"Failed to seal call log partitions: {e}")
+
+    def close(self):
+        """未書き込みの受電履歴を書き終えてから終了（shutdown時）"""
+        self.writer.close()
+        if self.election.is_leader:
+            self.search_index.save()
+        self.election.release()
+
+    def _on_append(self, file_path: Path, start: int, end: int, values: list):
+        """書き込みスレッドが追記した1行をメモリ上の受電履歴と検索インデックスに反映"""
+        self.store.record_append(file_path, start, end, values)
+        source = self._search_source(file_path)
+        with self._search_sync_lock:
+            state = self.search_index.source_state(source)
+            if state is not None and state[1] == start:
+                self.search_index.add_rows(source, [dict(zip(OPERATOR_FILE_HEADERS, values))], end, state[0])
+                return
+        self._sync_search_file(str(file_path))
+
+    def _search_source(self, file_path) -> str:
+        return os.path.relpath(file_path, self.data_dir)
+
+    def _sync_search_file(self, file_path: str):
+        """検索インデックスにファイルの未索引分を追加（置換・縮小されていれば索引し直す）"""
+        source = self._search_source(file_path)
+        with self._search_sync_lock:
+            stat = os.stat(file_path)
+            state = self.search_index.source_state(source)
+            offset = 0
+            if state is not None:
+                inode, offset = state
+                if (inode, offset) == (stat.st_ino, stat.st_size):
+                    return
+                if inode != stat.st_ino or stat.st_size < offset:
+                    self.search_index.reset_source(source)
+                    offset = 0
+            values, end, inode = read_appended_rows(Path(file_path), offset)
+            self.search_index.add_rows(source, [dict(zip(OPERATOR_FILE_HEADERS, v)) for v in values], end, inode)
+
+    def _sync_search_index(self):
+        """全オペレーターファイルと検索インデックスを突き合わせる（statのみ、変更分だけ読む）"""
+        operator_files = partitions.all_operator_files(self.data_dir)
+        for source in set(self.search_index.sources()) - {self._search_source(f) for f in operator_files}:
+            self.search_index.reset_source(source)
+        for file_path in operator_files:
+            try:
+                self._sync_search_file(file_path)
+            except Exception as e:
+                logger.warning(f"Failed to index operator file {file_path}: {e}")
     
-    def _ensure_operator_file_exists(self, file_path: Path):
-        """オペレーター別CSVファイルが存在しない場合は作成"""
-        if not file_path.exists():
-            headers = [
-                '受電日時', '開始時間', '完了時間', 'オペレーター名', 
-                '回線種別', '問合せ種別', '所在地', '関連項目',
-                '研修名', '研修日', 'Web連携ID', 
-                '受講者名', '電話番号', 'メールアドレス',
-                '問合せ内容', '対応内容', '二次対応時間', '完了状況'
-            ]
-            
-            with open(file_path, 'w', newline='', encoding='cp932') as f:
-                writer = csv.writer(f)
-                writer.writerow(headers)
-            
-            logger.info(f"Operator call log file created: {file_path}")
+    def _schedule_merge(self):
+        """マージをバックグラウンドで実行（実行中なら_merge_filesがスキップする）"""
+        task = asyncio.create_task(self._merge_all_files())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
     
     async def _merge_all_files(self):
-        """全オペレーターファイルをマージ（排他制御付き）"""
+        """マージ処理をイベントループ外で実行"""
+        await asyncio.to_thread(self._merge_files)
+    
+    def _merge_files(self):
+        """全オペレーターファイルをマージ（排他制御付き・前回マージ以降の追記分のみ反映）
+
+        担当プロセス以外は何もしない。他プロセスが追記した分も担当プロセスの定期マージで反映される。
+        """
+        if not self.election.is_leader:
+            return
         # マージ処理の排他制御
         if not self._merge_lock.acquire(blocking=False):
-            logger.info("Merge already in progress, skipping duplicate merge request")
+            # 実行中のマージが終わった後にもう一度マージさせる
+            self._merge_pending = True
+            logger.info("Merge already in progress, deferring merge request")
             return
         
         try:
-            logger.info("Starting file merge with exclusive lock")
-            all_rows = []
-            headers = [
-                '受電日時', '開始時間', '完了時間', 'オペレーター名', 
-                '回線種別', '問合せ種別', '所在地', '関連項目',
-                '研修名', '研修日', 'Web連携ID', 
-                '受講者名', '電話番号', 'メールアドレス',
-                '問合せ内容', '対応内容', '二次対応時間', '完了状況'
-            ]
-            
-            # 全オペレーターファイルを読み込み（ファイルロック付き）
-            operator_files = glob.glob(str(self.data_dir / "operator_*.csv"))
-            
-            for file_path in operator_files:
-                try:
-                    with open(file_path, 'r', encoding='cp932') as f:
-                        # ファイルロックで読み込み保護
-                        try:
-                            fcntl.flock(f.fileno(), fcntl.LOCK_SH | fcntl.LOCK_NB)  # 共有ロック（非ブロッキング）
-                            reader = csv.reader(f)
-                            rows = list(reader)
-                            if len(rows) > 1:  # ヘッダー以外の行がある場合
-                                all_rows.extend(rows[1:])  # ヘッダーを除いて追加
-                        except (OSError, IOError) as lock_error:
-                            logger.warning(f"File {file_path} is locked, skipping: {lock_error}")
-                            continue
-                        finally:
-                            try:
-                                fcntl.flock(f.fileno(), fcntl.LOCK_UN)  # ロック解除
-                            except:
-                                pass
-                                
-                except Exception as e:
-                    logger.warning(f"Failed to read operator file {file_path}: {e}")
-            
-            # 受電日時でソート
-            all_rows.sort(key=lambda x: x[0] if x else '')
-            
-            # マージファイルに書き出し（ファイルロック付き）
-            temp_file = self.merged_file_path.with_suffix('.tmp')
-            try:
-                with open(temp_file, 'w', newline='', encoding='cp932') as f:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)  # 排他ロック
-                    writer = csv.writer(f)
-                    writer.writerow(headers)
-                    writer.writerows(all_rows)
-                
-                # 原子操作でファイル置換
-                temp_file.replace(self.merged_file_path)
-                logger.info(f"On-demand merge completed: {len(all_rows)} records from {len(operator_files)} operator files")
-                
-            except Exception as e:
-                # エラー時は一時ファイルを削除
-                if temp_file.exists():
-                    temp_file.unlink()
-                raise e
+            while True:
+                self._merge_pending = False
+                self._seal_closed_partitions()
+                operator_files = partitions.all_operator_files(self.data_dir)
+
+                if self._needs_full_merge(operator_files):
+                    self._full_merge(operator_files)
+                else:
+                    self._incremental_merge(operator_files)
+
+                if not self._merge_pending:
+                    break
             
         except Exception as e:
             logger.error(f"Failed to merge files: {e}")
         finally:
             self._merge_lock.release()
             logger.debug("Merge lock released")
+        # 検索インデックスも一定間隔でディスクへ保存
+        self.search_index.save(min_interval=settings.CALL_LOG_SEARCH_SAVE_SECONDS)
     
-    async def save_call_log(self, call_log: CallLogRequest) -> CallLogResponse:
-        """受電履歴をオペレーター別CSVに保存（排他制御付き）"""
-        operator_name = call_log.オペレーター名
-        write_lock = self._get_write_lock(operator_name)
+    def _needs_full_merge(self, operator_files: list) -> bool:
+        """前回の読み取り位置が使えない場合（初回・ファイルの縮小/置換/削除）は全件マージ"""
+        if self._merge_offsets is None or not self.merged_file_path.exists():
+            return True
+        if set(self._merge_offsets) - set(operator_files):
+            logger.info("Operator file removed, falling back to full merge")
+            return True
+
+        for file_path in operator_files:
+            previous = self._merge_offsets.get(file_path)
+            if previous is None:
+                continue
+            inode, offset = previous
+            stat = os.stat(file_path)
+            if stat.st_ino != inode or stat.st_size < offset:
+                logger.info(f"Operator file rewritten, falling back to full merge: {file_path}")
+                return True
+        return False
+    
+    def _read_new_rows(self, operator_files: list, offsets: dict) -> list:
+        """各オペレーターファイルの追記分をマージファイルの列で読み、offsetsを更新（ファイル毎に受電日時順）"""
+        new_rows = []
+        for file_path in operator_files:
+            previous_inode, offset = offsets.get(file_path, (None, 0))
+            try:
+                stat = os.stat(file_path)
+                if (stat.st_ino, stat.st_size) == (previous_inode, offset):
+                    # 追記の無いファイル（締めた月など）は開かない
+                    continue
+                rows, end, inode = read_appended_rows(Path(file_path), offset)
+            except Exception as e:
+                logger.warning(f"Failed to read operator file {file_path}: {e}")
+                continue
+            offsets[file_path] = (inode, end)
+            if rows:
+                rows = [row[:len(CALL_LOG_HEADERS)] for row in rows]
+                rows.sort(key=_row_key)
+                new_rows.append(rows)
+        return new_rows
+    
+    def _write_merged(self, rows):
+        """マージファイルを一時ファイル経由で書き換え"""
+        temp_file = self.merged_file_path.with_suffix('.tmp')
+        try:
+            with open(temp_file, 'w', newline='', encoding='cp932') as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)  # 排他ロック
+                writer = csv.writer(f)
+                writer.writerow(CALL_LOG_HEADERS)
+                count = 0
+                for row in rows:
+                    writer.writerow(row)
+                    count += 1
+            
+            # 原子操作でファイル置換
+            temp_file.replace(self.merged_file_path)
+            return count
+            
+        except Exception as e:
+            # エラー時は一時ファイルを削除
+            if temp_file.exists():
+                temp_file.unlink()
+            raise e
+    
+    def _full_merge(self, operator_files: list):
+        logger.info("Starting full file merge with exclusive lock")
+        offsets = {}
+        new_rows = self._read_new_rows(operator_files, offsets)
+        all_rows = [row for rows in new_rows for row in rows]
+        
+        # 受電日時でソート
+        all_rows.sort(key=_row_key)
+        count = self._write_merged(all_rows)
+        
+        self._merge_offsets = offsets
+        self._merged_last_key = _row_key(all_rows[-1]) if all_rows else ''
+        logger.info(f"On-demand merge completed: {count} records from {len(operator_files)} operator files")
+    
+    def _incremental_merge(self, operator_files: list):
+        offsets = dict(self._merge_offsets)
+        new_rows = self._read_new_rows(operator_files, offsets)
+        if not new_rows:
+            self._merge_offsets = offsets
+            return
+        
+        # 各ファイルは受電日時順なので、k-wayマージで1本にする
+        merged_new = list(heapq.merge(*new_rows, key=_row_key))
+        
+        if _row_key(merged_new[0]) >= self._merged_last_key:
+            # 既存の末尾より新しい行だけなら追記で済む
+            with open(self.merged_file_path, 'a', newline='', encoding='cp932') as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    csv.writer(f).writerows(merged_new)
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        else:
+            # 過去日時の行が混ざる場合は既存のマージ結果と合わせて書き直す
+            with open(self.merged_file_path, 'r', newline='', encoding='cp932') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                existing = [row for row in reader if row]
+            self._write_merged(heapq.merge(existing, merged_new, key=_row_key))
         
+        self._merge_offsets = offsets
+        self._merged_last_key = max(self._merged_last_key, _row_key(merged_new[-1]))
+        logger.info(f"Incremental merge completed: {len(merged_new)} new records")
+    
+    async def save_call_log(self, call_log: CallLogRequest) -> CallLogResponse:
+        """受電履歴をオペレーター別CSVに保存（書き込みスレッドで永続化されてから応答）"""
         try:
             # 受電日時をフォーマット
             try:
@@ -141,40 +344,38 @@ class CallLogService:
             except:
                 formatted_datetime = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
-            # オペレーター別書き込みロック取得
-            with write_lock:
-                operator_file_path = self._get_operator_file_path(operator_name)
-                self._ensure_operator_file_exists(operator_file_path)
-                
-                # オペレーター別CSVに追記（ファイルロック付き）
-                with open(operator_file_path, 'a', newline='', encoding='cp932') as f:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)  # 排他ロック
-                    try:
-                        writer = csv.writer(f)
-                        writer.writerow([
-                            formatted_datetime,
-                            call_log.開始時間,
-                            call_log.完了時間,
-                            call_log.オペレーター名,
-                            call_log.回線種別,
-                            call_log.問合せ種別,
-                            call_log.所在地,
-                            call_log.関連項目,
-                            call_log.研修名,
-                            call_log.研修日,
-                            call_log.Web連携ID,
-                            call_log.受講者名,
-                            call_log.電話番号,
-                            call_log.メールアドレス,
-                            call_log.問合せ内容,
-                            call_log.対応内容,
-                            call_log.二次対応時間 or '',
-                            call_log.完了状況
-                        ])
-                        f.flush()  # バッファをフラッシュ
-                        os.fsync(f.fileno())  # OSレベルで確実に書き込み
-                    finally:
-                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)  # ロック解除
+            month = partitions.partition_of(formatted_datetime)
+            if month < partitions.current_partition():
+                # 締めた月への遅れた書き込みはマニフェストを外してから
+                partitions.unseal_partition(self.data_dir, month)
+                self.store.unseal(month)
+            operator_file_path = self._get_operator_file_path(call_log.オペレーター名, month)
+            values = [
+                formatted_datetime,
+                call_log.開始時間,
+                call_log.完了時間,
+                call_log.オペレーター名,
+                call_log.回線種別,
+                call_log.問合せ種別,
+                call_log.所在地,
+                call_log.関連項目,
+                call_log.研修名,
+                call_log.研修日,
+                call_log.Web連携ID,
+                call_log.受講者名,
+                call_log.電話番号,
+                call_log.メールアドレス,
+                call_log.問合せ内容,
+                call_log.対応内容,
+                call_log.二次対応時間 or '',
+                call_log.完了状況
+            ]
+            
+            # オペレーター別CSVに追記（ファイルロック・fsync・メモリ上の受電履歴への反映は書き込みスレッドが行う）
+            await self.writer.append(operator_file_path, values)
+            
+            # back office用のマージファイルはバックグラウンドで更新
+            self._schedule_merge()
             
             logger.info(f"Call log saved: {call_log.オペレーター名} - {call_log.Web連携ID} - {call_log.受講者名}")
             
@@ -191,21 +392,82 @@ class CallLogService:
             )
     
     async def get_merged_call_logs(self) -> list:
-        """オンデマンドでマージしてから受電履歴を取得"""
+        """メモリ上の受電履歴を受電日時順で取得（ディスク上の変更は一定間隔で取り込む）"""
         try:
-            # リクエスト時にマージを実行
-            await self._merge_all_files()
-            
-            if not self.merged_file_path.exists():
-                logger.warning("Merged file does not exist after merge attempt")
-                return []
-            
-            with open(self.merged_file_path, 'r', encoding='cp932') as f:
-                reader = csv.DictReader(f)
-                return list(reader)
+            return await asyncio.to_thread(self.store.all_rows)
                 
         except Exception as e:
             logger.error(f"Failed to read merged call logs: {e}")
             return []
 
-call_log_service = CallLogService()
\ No newline at end of file
+    def version(self) -> str:
+        """受電履歴が変わると変わる値（ETag用）"""
+        return self.store.version()
+
+    def _refresh_store(self):
+        self.store.ensure_range()
+        self.store.reconcile()
+
+    async def stream_call_logs(self, batch_size: int = 500):
+        """受電日時順の全件をbatch_size件ずつ返す（全件のリストは作らず、1回分ずつメモリ上の順序から取り出す）"""
+        await asyncio.to_thread(self._refresh_store)
+        position = None
+        while True:
+            rows, position = self.store.rows_after(position, batch_size)
+            if not rows:
+                break
+            yield rows
+
+    def _summarize(self, date_from: date, date_to: date) -> dict:
+        self.store.reconcile()
+        return self.aggregates.summary(date_from, date_to)
+
+    async def get_call_log_stats(self, date_from: date, date_to: date) -> dict:
+        """期間内の受電件数・対応時間・エスカレーション率などの集計"""
+        return await asyncio.to_thread(self._summarize, date_from, date_to)
+
+    def _search(self, query: str, date_from: Optional[str], date_to: Optional[str], limit: int) -> list:
+        self._sync_search_index()
+        return self.search_index.search(query, date_from, date_to, limit)
+
+    async def search_call_logs(self, query: str, date_from: Optional[str] = None, date_to: Optional[str] = None, limit: int = 50) -> list:
+        """問合せ内容・対応内容・研修名・受講者名の全文検索（関連度順）"""
+        return await asyncio.to_thread(self._search, query, date_from, date_to, limit)
+
+    async def query_call_logs(
+        self,
+        filters: dict,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> tuple[list, Optional[str]]:
+        """条件で絞り込んだ受電履歴を1ページ分取得し、(行, 次ページのcursor) を返す"""
+        return self.store.query(
+            filters=filters,
+            date_from=date_from,
+            date_to=date_to,
+            descending=descending,
+            limit=limit,
+            cursor=cursor,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "backend": "csv",
+            "records": len(self.store),
+            "writer_process": self.election.is_leader,
+            "last_sequence": self.sequence.current(),
+            "writer": self.writer.stats(),
+            "search_index": self.search_index.stats(),
+        }
+
+def _create_call_log_service():
+    """Settings.CALL_LOG_BACKEND に応じて保存先を選択"""
+    if settings.CALL_LOG_BACKEND == "sqlite":
+        from service.call_log_sqlite import SqliteCallLogService
+        return SqliteCallLogService(CALL_LOG_HEADERS)
+    return CallLogService()
+
+call_log_service = _create_call_log_service()
\ No newline at end of file
@@ -0,0 +1,451 @@
+# service/call_log_sqlite.py
+
+import asyncio
+import base64
+import csv
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Optional
+from schemas.call_log_schema import CallLogRequest, CallLogResponse
+from config.settings import settings
+from service import call_log_partitions as partitions
+from service.call_log_search import CallLogSearchIndex
+from service.call_log_stats import CallLogStats
+from service.call_log_store import INDEXED_COLUMNS
+from service.csv_tail import read_appended_rows
+from service.process_coordination import WriterElection
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+# 検索インデックス上のDBのキー
+SEARCH_SOURCE = "sqlite:call_logs"
+
+def _encode_cursor(position: tuple) -> str:
+    """cursor: (受電日時, 行のid)"""
+    return base64.urlsafe_b64encode(json.dumps(list(position), ensure_ascii=False).encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        key, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+        return str(key), int(row_id)
+    except Exception:
+        raise ValueError("cursorの形式が不正です")
+
+def _quote(column: str) -> str:
+    return '"' + column.replace('"', '""') + '"'
+
+class SqliteCallLogService:
+    """受電履歴をSQLite（WALモード）に保存するバックエンド
+
+    CallLogServiceと同じインターフェース。CALL_LOG_BACKEND=sqlite で選択する。
+    - 受電日時・オペレーター名・Web連携IDにインデックス
+    - 初回起動時に既存の operator_*.csv（月毎のパーティションと旧形式のファイル）を一度だけ取り込む
+    - back office用の merged_call_logs.csv（cp932）は保存後にバックグラウンドで書き出す
+    - 複数ワーカーでも書き込みはSQLiteが直列化し、IDがプロセスをまたいだ連番になる。
+      merged_call_logs.csv と検索インデックスの保存はロックファイルを取れた1プロセスだけが行う
+    """
+
+    def __init__(self, headers: list):
+        self.headers = headers
+        self.data_dir = settings.BASE_DIR / "data" / "call_logs"
+        self.merged_file_path = self.data_dir / "merged_call_logs.csv"
+        self.db_path = settings.CALL_LOG_SQLITE_PATH
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._columns = ", ".join(_quote(h) for h in headers)
+        # 書き込みは1接続に直列化し、読み込みはスレッド毎の接続で行う（WALなので書き込み中も読める）
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._connections: list = []
+        self._export_lock = threading.Lock()
+        self._export_pending = False
+        # 書き出し済みの最大IDと、その時点の最大受電日時
+        self._exported_id: Optional[int] = None
+        self._exported_last_key = ''
+        self._background_tasks = set()
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self.election = WriterElection(self.data_dir / ".writer.lock")
+        # 日別集計に反映済みの最大ID（他プロセスが書き込んでいれば集計を作り直す）
+        self._aggregated_id: Optional[int] = None
+        # /call-log/stats 用の日別集計（書き込みと同じロックで加算）
+        self.aggregates = CallLogStats(self._rows_in_month, lock=self._write_lock)
+        # /call-log/search 用の全文検索インデックス（索引済みの最大IDまでを保持）
+        self.search_index = CallLogSearchIndex(settings.CALL_LOG_SEARCH_INDEX_PATH, headers)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={'FULL' if settings.CALL_LOG_FSYNC else 'NORMAL'}")
+            self._local.conn = conn
+            self._connections.append(conn)
+        return conn
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        columns = ",\n".join(f"    {_quote(h)} TEXT" for h in self.headers)
+        conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS call_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+            {columns}
+            );
+            CREATE INDEX IF NOT EXISTS idx_call_logs_received ON call_logs ("受電日時", id);
+            CREATE INDEX IF NOT EXISTS idx_call_logs_operator ON call_logs ("オペレーター名", "受電日時");
+            CREATE INDEX IF NOT EXISTS idx_call_logs_web_id ON call_logs ("Web連携ID");
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        conn.commit()
+
+    def load(self):
+        """起動時にスキーマを作成し、未取り込みならCSVを取り込んでマージファイルを最新化"""
+        with self._write_lock:
+            conn = self._connect()
+            self._create_schema(conn)
+            imported = conn.execute("SELECT value FROM meta WHERE key = 'csv_imported'").fetchone()
+        if imported is None:
+            self.import_operator_csvs()
+        self.election.try_acquire()
+        self._export_merged()
+        self.search_index.load()
+        self._sync_search_index()
+
+    def close(self):
+        """shutdown時に検索インデックスを保存し、全スレッドの接続を閉じる"""
+        if self.election.is_leader:
+            self.search_index.save()
+        self.election.release()
+        with self._write_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+            self._local = threading.local()
+
+    def import_operator_csvs(self) -> int:
+        """既存の operator_*.csv（月毎のパーティションと旧形式のファイル）を取り込む（1回だけ。取り込み済みの記録はmetaに残す）"""
+        operator_files = partitions.all_operator_files(self.data_dir)
+        placeholders = ", ".join("?" for _ in self.headers)
+        count = 0
+        with self._write_lock:
+            conn = self._connect()
+            with conn:
+                # 複数ワーカーが同時に起動しても1プロセスだけが取り込む
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("SELECT 1 FROM meta WHERE key = 'csv_imported'").fetchone():
+                    return 0
+                for file_path in operator_files:
+                    rows, _, _ = read_appended_rows(Path(file_path), 0)
+                    values = [(row + [''] * len(self.headers))[:len(self.headers)] for row in rows]
+                    # 受電日時順に入れてIDの順序と揃える
+                    values.sort(key=lambda v: v[0])
+                    conn.executemany(f"INSERT INTO call_logs ({self._columns}) VALUES ({placeholders})", values)
+                    count += len(values)
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_imported', ?)",
+                    (datetime.now().isoformat(timespec="seconds"),)
+                )
+        self.aggregates.invalidate()
+        logger.info(f"Imported {count} call logs from {len(operator_files)} operator files into SQLite")
+        return count
+
+    def _insert(self, values: list):
+        placeholders = ", ".join("?" for _ in self.headers)
+        with self._write_lock:
+            conn = self._connect()
+            with conn:
+                row_id = conn.execute(f"INSERT INTO call_logs ({self._columns}) VALUES ({placeholders})", values).lastrowid
+            if self._aggregated_id is not None and row_id == self._aggregated_id + 1:
+                self._aggregated_id = row_id
+            self.aggregates.record(dict(zip(self.headers, values)))
+            self._sync_search_index()
+
+    def _sync_search_index(self):
+        """索引済みの最大IDより後の行を検索インデックスに追加"""
+        with self._write_lock:
+            state = self.search_index.source_state(SEARCH_SOURCE)
+            last_id = state[1] if state else 0
+            rows = self._connect().execute(
+                f"SELECT id, {self._columns} FROM call_logs WHERE id > ? ORDER BY id", (last_id,)
+            ).fetchall()
+            if rows:
+                self.search_index.add_rows(SEARCH_SOURCE, [self._to_dict(row) for row in rows], rows[-1]["id"])
+
+    async def search_call_logs(self, query: str, date_from: Optional[str] = None, date_to: Optional[str] = None, limit: int = 50) -> list:
+        """問合せ内容・対応内容・研修名・受講者名の全文検索（関連度順）"""
+        return await asyncio.to_thread(self._search, query, date_from, date_to, limit)
+
+    def _search(self, query: str, date_from: Optional[str], date_to: Optional[str], limit: int) -> list:
+        # 他プロセスが書き込んだ行も索引してから検索
+        self._sync_search_index()
+        return self.search_index.search(query, date_from, date_to, limit)
+
+    def start(self):
+        """lifespanから起動。担当プロセスの選出と、他プロセスが書き込んだ分の書き出しを定期的に行う"""
+        self._maintenance_task = asyncio.create_task(self._maintain())
+
+    async def stop(self):
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+            self._maintenance_task = None
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(settings.CALL_LOG_RECONCILE_SECONDS)
+            try:
+                # 担当プロセスが終了していれば引き継ぐ
+                if self.election.try_acquire():
+                    await asyncio.to_thread(self._export_merged)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Call log maintenance failed: {e}")
+
+    def _schedule_export(self):
+        task = asyncio.create_task(asyncio.to_thread(self._export_merged))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _export_merged(self):
+        """merged_call_logs.csv を書き出す（新しい行が末尾より後なら追記、それ以外は全件書き直し。担当プロセスのみ）"""
+        if not self.election.is_leader:
+            return
+        if not self._export_lock.acquire(blocking=False):
+            self._export_pending = True
+            return
+        try:
+            while True:
+                self._export_pending = False
+                if self._exported_id is None or not self.merged_file_path.exists():
+                    self._export_all()
+                else:
+                    self._export_appended()
+                if not self._export_pending:
+                    break
+        except Exception as e:
+            logger.error(f"Failed to export merged call logs: {e}")
+        finally:
+            self._export_lock.release()
+        self.search_index.save(min_interval=settings.CALL_LOG_SEARCH_SAVE_SECONDS)
+
+    def _export_all(self):
+        conn = self._connect()
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM call_logs").fetchone()[0]
+        cursor = conn.execute(
+            f"SELECT {self._columns} FROM call_logs WHERE id <= ? ORDER BY \"受電日時\", id", (max_id,)
+        )
+        temp_file = self.merged_file_path.with_suffix('.tmp')
+        last_key = ''
+        count = 0
+        try:
+            with open(temp_file, 'w', newline='', encoding='cp932') as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                writer = csv.writer(f)
+                writer.writerow(self.headers)
+                for row in cursor:
+                    writer.writerow(tuple(row))
+                    last_key = row[0] or ''
+                    count += 1
+            temp_file.replace(self.merged_file_path)
+        except Exception:
+            if temp_file.exists():
+                temp_file.unlink()
+            raise
+        self._exported_id = max_id
+        self._exported_last_key = last_key
+        logger.info(f"Merged call log export completed: {count} records")
+
+    def _export_appended(self):
+        conn = self._connect()
+        rows = conn.execute(
+            f"SELECT id, {self._columns} FROM call_logs WHERE id > ? ORDER BY \"受電日時\", id",
+            (self._exported_id,)
+        ).fetchall()
+        if not rows:
+            return
+        if (rows[0][1] or '') < self._exported_last_key:
+            # 過去日時の行が混ざる場合は全件書き直す
+            self._export_all()
+            return
+
+        with open(self.merged_file_path, 'a', newline='', encoding='cp932') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                csv.writer(f).writerows(tuple(row)[1:] for row in rows)
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        self._exported_id = max(row[0] for row in rows)
+        self._exported_last_key = rows[-1][1] or ''
+
+    async def save_call_log(self, call_log: CallLogRequest) -> CallLogResponse:
+        """受電履歴をSQLiteに保存"""
+        try:
+            try:
+                dt = datetime.fromisoformat(call_log.受電日時.replace('Z', '+00:00'))
+                formatted_datetime = dt.strftime('%Y-%m-%d %H:%M:%S')
+            except:
+                formatted_datetime = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+            values = [
+                formatted_datetime,
+                call_log.開始時間,
+                call_log.完了時間,
+                call_log.オペレーター名,
+                call_log.回線種別,
+                call_log.問合せ種別,
+                call_log.所在地,
+                call_log.関連項目,
+                call_log.研修名,
+                call_log.研修日,
+                call_log.Web連携ID,
+                call_log.受講者名,
+                call_log.電話番号,
+                call_log.メールアドレス,
+                call_log.問合せ内容,
+                call_log.対応内容,
+                call_log.二次対応時間 or '',
+                call_log.完了状況
+            ]
+            await asyncio.to_thread(self._insert, values)
+            self._schedule_export()
+
+            logger.info(f"Call log saved: {call_log.オペレーター名} - {call_log.Web連携ID} - {call_log.受講者名}")
+            return CallLogResponse(
+                success=True,
+                message="受電履歴を保存しました"
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to save call log: {e}")
+            return CallLogResponse(
+                success=False,
+                message=f"保存に失敗しました: {str(e)}"
+            )
+
+    def _select(self, where: str = "", params: tuple = (), order: str = "ASC", limit: Optional[int] = None) -> list:
+        sql = f"SELECT id, {self._columns} FROM call_logs {where} ORDER BY \"受電日時\" {order}, id {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self._connect().execute(sql, params).fetchall()
+
+    def _to_dict(self, row: sqlite3.Row) -> dict:
+        return {h: row[h] for h in self.headers}
+
+    async def get_merged_call_logs(self) -> list:
+        """受電日時順の全件"""
+        try:
+            rows = await asyncio.to_thread(self._select)
+            return [self._to_dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Failed to read call logs from SQLite: {e}")
+            return []
+
+    def _rows_in_month(self, month: str) -> list:
+        low, high = partitions.partition_bounds(month)
+        rows = self._connect().execute(
+            f"SELECT {self._columns} FROM call_logs WHERE \"受電日時\" BETWEEN ? AND ?", (low, high)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    async def get_call_log_stats(self, date_from: date, date_to: date) -> dict:
+        """期間内の受電件数・対応時間・エスカレーション率などの集計"""
+        return await asyncio.to_thread(self._summarize, date_from, date_to)
+
+    def _summarize(self, date_from: date, date_to: date) -> dict:
+        with self._write_lock:
+            max_id = self._connect().execute("SELECT MAX(id) FROM call_logs").fetchone()[0]
+            if max_id != self._aggregated_id:
+                # 他プロセスの書き込みは日別集計に加算されていないので作り直す
+                self.aggregates.invalidate()
+                self._aggregated_id = max_id
+        return self.aggregates.summary(date_from, date_to)
+
+    def version(self) -> str:
+        """DBファイルとWALファイルのサイズ・mtimeから作るETag用の値"""
+        signature = []
+        for path in (self.db_path, Path(f"{self.db_path}-wal")):
+            try:
+                stat = os.stat(path)
+                signature.append((str(path), stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                signature.append((str(path), None, None))
+        return hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()
+
+    async def stream_call_logs(self, batch_size: int = 500):
+        """受電日時順の全件を読み込みながらbatch_size件ずつ返す"""
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = await asyncio.to_thread(
+                conn.execute, f"SELECT {self._columns} FROM call_logs ORDER BY \"受電日時\", id"
+            )
+            while True:
+                rows = await asyncio.to_thread(cursor.fetchmany, batch_size)
+                if not rows:
+                    break
+                yield [self._to_dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    async def query_call_logs(
+        self,
+        filters: dict,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> tuple[list, Optional[str]]:
+        """条件で絞り込んだ受電履歴を1ページ分取得し、(行, 次ページのcursor) を返す"""
+        conditions, params = [], []
+        for column, value in filters.items():
+            if value is None:
+                continue
+            if column not in INDEXED_COLUMNS:
+                raise ValueError(f"絞り込みできない列です: {column}")
+            conditions.append(f"{_quote(column)} = ?")
+            params.append(value)
+        if date_from:
+            conditions.append('"受電日時" >= ?')
+            params.append(date_from)
+        if date_to:
+            conditions.append('"受電日時" <= ?')
+            params.append(date_to)
+        if cursor:
+            key, row_id = _decode_cursor(cursor)
+            conditions.append(f"(\"受電日時\", id) {'<' if descending else '>'} (?, ?)")
+            params.extend([key, row_id])
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = "DESC" if descending else "ASC"
+        rows = await asyncio.to_thread(
+            self._select, where, tuple(params), order, limit + 1 if limit is not None else None
+        )
+
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor((rows[-1]["受電日時"] or '', rows[-1]["id"]))
+        return [self._to_dict(row) for row in rows], next_cursor
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        return {
+            "backend": "sqlite",
+            "records": conn.execute("SELECT COUNT(*) FROM call_logs").fetchone()[0],
+            "exported_id": self._exported_id,
+            "writer_process": self.election.is_leader,
+            "search_index": self.search_index.stats(),
+        }
@@ -0,0 +1,172 @@
+# service/call_log_stats.py
+
+import logging
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from typing import Callable, Iterable, Optional
+from service import call_log_partitions as partitions
+
+logger = logging.getLogger(__name__)
+
+ESCALATION_STATUS = "エスカレーション"
+
+def _clock_seconds(value: str) -> Optional[int]:
+    """HH:MM または HH:MM:SS を0時からの秒数に変換"""
+    try:
+        parts = [int(p) for p in (value or "").strip().split(":")]
+    except ValueError:
+        return None
+    if len(parts) == 2:
+        parts.append(0)
+    if len(parts) != 3:
+        return None
+    hours, minutes, seconds = parts
+    return hours * 3600 + minutes * 60 + seconds
+
+def handle_seconds(start: str, end: str) -> Optional[int]:
+    """開始時間〜完了時間の対応秒数（日付をまたぐ場合は翌日の時刻として扱う）"""
+    start_seconds, end_seconds = _clock_seconds(start), _clock_seconds(end)
+    if start_seconds is None or end_seconds is None:
+        return None
+    return (end_seconds - start_seconds) % 86400
+
+class _DayBucket:
+    """1日分の集計値"""
+    __slots__ = ("total", "by_operator", "by_inquiry_type", "by_line_type", "by_hour", "by_status",
+                 "handle_seconds", "handle_count", "handle_by_operator")
+
+    def __init__(self):
+        self.total = 0
+        self.by_operator = Counter()
+        self.by_inquiry_type = Counter()
+        self.by_line_type = Counter()
+        self.by_hour = Counter()
+        self.by_status = Counter()
+        self.handle_seconds = 0
+        self.handle_count = 0
+        # オペレーター名 -> [対応秒数の合計, 件数]
+        self.handle_by_operator: dict = {}
+
+    def add(self, row: dict):
+        received_at = row.get('受電日時') or ''
+        operator = row.get('オペレーター名') or ''
+        self.total += 1
+        self.by_operator[operator] += 1
+        self.by_inquiry_type[row.get('問合せ種別') or ''] += 1
+        self.by_line_type[row.get('回線種別') or ''] += 1
+        self.by_hour[received_at[11:13] or ''] += 1
+        self.by_status[row.get('完了状況') or ''] += 1
+
+        seconds = handle_seconds(row.get('開始時間'), row.get('完了時間'))
+        if seconds is not None:
+            self.handle_seconds += seconds
+            self.handle_count += 1
+            totals = self.handle_by_operator.setdefault(operator, [0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+
+class CallLogStats:
+    """受電履歴の日別集計
+
+    - 保存時に該当日の集計値を加算するだけ（O(1)）
+    - 月単位で、初めて必要になった時に元データ（loader）から作り直す
+    - 期間指定の集計は日別の集計値を足し合わせるだけで、元の行は読まない
+    """
+
+    def __init__(self, loader: Callable[[str], Iterable[dict]], lock: Optional[threading.RLock] = None):
+        # 月 -> その月の行（CSV・DBから読む）
+        self.loader = loader
+        self._days: dict = {}
+        self._built_months: set = set()
+        # 元データへの反映と加算が同じロックの中で行われるよう、保存先のロックを共有する
+        self._lock = lock or threading.RLock()
+
+    def _build_month(self, month: str):
+        for day in [d for d in self._days if d.startswith(month)]:
+            del self._days[day]
+        count = 0
+        for row in self.loader(month):
+            self._add(row)
+            count += 1
+        self._built_months.add(month)
+        logger.info(f"Call log stats rebuilt: {month} ({count} records)")
+
+    def _add(self, row: dict):
+        day = (row.get('受電日時') or '')[:10]
+        bucket = self._days.get(day)
+        if bucket is None:
+            bucket = self._days[day] = _DayBucket()
+        bucket.add(row)
+
+    def record(self, row: dict):
+        """保存した1行を加算（未集計の月は集計時に元データから作るので何もしない）"""
+        with self._lock:
+            if partitions.partition_of(row.get('受電日時') or '') in self._built_months:
+                self._add(row)
+
+    def invalidate(self, month: Optional[str] = None):
+        """API外で元データが変わった月（Noneなら全て）を次回の集計時に作り直す"""
+        with self._lock:
+            if month is None:
+                self._built_months.clear()
+            else:
+                self._built_months.discard(month)
+
+    def summary(self, date_from: date, date_to: date) -> dict:
+        """date_from〜date_to（両端含む）の集計"""
+        months = []
+        day = date_from.replace(day=1)
+        while day <= date_to:
+            months.append(day.strftime("%Y-%m"))
+            day = (day + timedelta(days=32)).replace(day=1)
+
+        with self._lock:
+            for month in months:
+                if month not in self._built_months:
+                    self._build_month(month)
+
+            calls = 0
+            by_operator, by_inquiry_type, by_line_type = Counter(), Counter(), Counter()
+            by_hour, by_status = Counter(), Counter()
+            handle_total, handle_count = 0, 0
+            handle_by_operator: dict = {}
+            by_day = {}
+
+            day = date_from
+            while day <= date_to:
+                bucket = self._days.get(day.isoformat())
+                if bucket is not None:
+                    by_day[day.isoformat()] = bucket.total
+                    calls += bucket.total
+                    by_operator.update(bucket.by_operator)
+                    by_inquiry_type.update(bucket.by_inquiry_type)
+                    by_line_type.update(bucket.by_line_type)
+                    by_hour.update(bucket.by_hour)
+                    by_status.update(bucket.by_status)
+                    handle_total += bucket.handle_seconds
+                    handle_count += bucket.handle_count
+                    for operator, (seconds, count) in bucket.handle_by_operator.items():
+                        totals = handle_by_operator.setdefault(operator, [0, 0])
+                        totals[0] += seconds
+                        totals[1] += count
+                day += timedelta(days=1)
+
+        escalations = by_status.get(ESCALATION_STATUS, 0)
+        return {
+            "date_from": date_from,
+            "date_to": date_to,
+            "total": calls,
+            "by_day": by_day,
+            "by_operator": dict(by_operator.most_common()),
+            "by_inquiry_type": dict(by_inquiry_type.most_common()),
+            "by_line_type": dict(by_line_type.most_common()),
+            "by_hour": dict(sorted(by_hour.items())),
+            "by_status": dict(by_status.most_common()),
+            "average_handle_seconds": round(handle_total / handle_count, 1) if handle_count else None,
+            "average_handle_seconds_by_operator": {
+                operator: round(seconds / count, 1) for operator, (seconds, count) in sorted(handle_by_operator.items())
+            },
+            "escalations": escalations,
+            "escalation_rate": round(escalations / calls, 4) if calls else None,
+        }
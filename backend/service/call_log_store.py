@@ -0,0 +1,384 @@
+# service/call_log_store.py
+
+import base64
+import bisect
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from service import call_log_partitions as partitions
+from service.csv_tail import read_appended_rows
+
+logger = logging.getLogger(__name__)
+
+# ハッシュインデックスを持つ列
+INDEXED_COLUMNS = ['オペレーター名', 'Web連携ID', '完了状況', '問合せ種別', '所在地']
+
+def _sort_key(row: dict) -> str:
+    return row.get('受電日時') or ''
+
+def _encode_cursor(position: tuple) -> str:
+    """cursor: (受電日時, ファイル, ファイル内の行番号)"""
+    return base64.urlsafe_b64encode(json.dumps(list(position), ensure_ascii=False).encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        key, source, line = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+        return str(key), str(source), int(line)
+    except Exception:
+        raise ValueError("cursorの形式が不正です")
+
+# 同じ受電日時の行の並び順は (data_dir からの相対パス, ファイル内の行番号) で決める。
+# 追記のみのファイルでは再読込後も、別ワーカーのプロセスでも同じ値になるので、cursorに使える。
+# 順序インデックスの要素は (受電日時, 相対パス, 行番号, 行ID)。
+_MAX_SOURCE = '\uffff'
+
+class _FileState:
+    """1オペレーターファイル分の読み込み状態と行データ"""
+    __slots__ = ("month", "inode", "offset", "mtime_ns", "rows")
+
+    def __init__(self, month: Optional[str]):
+        self.month = month
+        self.inode = None
+        self.offset = 0
+        self.mtime_ns = 0
+        self.rows: list = []
+
+class CallLogStore:
+    """オペレーター別CSVの内容をメモリ上に受電日時順で保持する
+
+    - 月毎のパーティションは必要になった時に1回だけ読み込む（起動時は当月と旧形式のファイルのみ）
+    - 締めた月（マニフェストが有効な月）は変更されない前提で、定期的なstatの対象から外す
+    - save_call_log の追記はディスクを読み直さずに反映する
+    - API外でのファイル変更（手修正・別プロセスの追記）は一定間隔のstatで検知して取り込む
+    - 受電日時の順序インデックス（(受電日時, ファイル, 行番号, 行ID)のソート済みリスト）と、
+      主要な分類列の値毎に同じ順で並べたインデックスを維持し、1ページ分の件数程度のコストで検索する
+    """
+
+    def __init__(self, data_dir: Path, headers: list, reconcile_interval: float):
+        self.data_dir = data_dir
+        self.headers = headers
+        self.reconcile_interval = reconcile_interval
+        self._files: dict = {}
+        # 行ID -> 行
+        self._by_id: dict = {}
+        # (受電日時, ファイル, 行番号, 行ID) の昇順リスト
+        self._order: list = []
+        # 列名 -> 値 -> _orderと同じ形式・順序のリスト
+        self._indexes: dict = {}
+        self._next_id = 0
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._last_reconciled = 0.0
+        # 読み込み済みの月と、そのうち締めた月のマニフェスト
+        self._loaded_months: set = set()
+        self._sealed: dict = {}
+        # 行の追加（record(row)）と作り直し（invalidate(month)）を通知する先（集計など）
+        self.listeners: list = []
+
+    @property
+    def lock(self) -> threading.RLock:
+        return self._lock
+
+    def _notify_record(self, rows: list):
+        for listener in self.listeners:
+            for row in rows:
+                listener.record(row)
+
+    def _notify_invalidate(self):
+        for listener in self.listeners:
+            listener.invalidate()
+
+    def _operator_files(self) -> list:
+        """変更を確認する対象（旧形式のファイルと、読み込み済みで締めていない月のファイル）"""
+        files = partitions.legacy_files(self.data_dir)
+        for month in sorted(self._loaded_months - set(self._sealed)):
+            files.extend(partitions.partition_files(self.data_dir, month))
+        return files
+
+    def _to_dict(self, values: list) -> dict:
+        row = dict(zip(self.headers, values))
+        for header in self.headers[len(values):]:
+            row[header] = None
+        return row
+
+    def _read_file(self, file_path: str, state: _FileState) -> list:
+        """前回位置以降の追記分を読み、状態を更新して新しい行を返す（ファイル内の行番号は len(state.rows) から続く）"""
+        stat = os.stat(file_path)
+        values, end, inode = read_appended_rows(Path(file_path), state.offset)
+        new_rows = [self._to_dict(v) for v in values]
+        state.inode = inode
+        state.offset = end
+        state.mtime_ns = stat.st_mtime_ns
+        state.rows.extend(new_rows)
+        return new_rows
+
+    def _rebuild_index(self):
+        """ファイル単位の行から全インデックスを作り直す"""
+        self._by_id = {}
+        self._order = []
+        self._indexes = {column: {} for column in INDEXED_COLUMNS}
+        self._next_id = 0
+        for file_path, state in self._files.items():
+            source = self._source(file_path)
+            for line, row in enumerate(state.rows):
+                self._order.append(self._register(row, source, line))
+        self._order.sort()
+        for values in self._indexes.values():
+            for entries in values.values():
+                entries.sort()
+
+    def _source(self, file_path) -> str:
+        return os.path.relpath(file_path, self.data_dir)
+
+    def _register(self, row: dict, source: str, line: int) -> tuple:
+        """行IDを振ってインデックスの要素を返す（列毎のインデックスには末尾に追加するだけ）"""
+        row_id = self._next_id
+        self._next_id += 1
+        self._by_id[row_id] = row
+        entry = (_sort_key(row), source, line, row_id)
+        for column in INDEXED_COLUMNS:
+            self._indexes[column].setdefault(row.get(column) or '', []).append(entry)
+        return entry
+
+    def _insert(self, row: dict, source: str, line: int):
+        entry = self._register(row, source, line)
+        bisect.insort(self._order, entry)
+        for column in INDEXED_COLUMNS:
+            entries = self._indexes[column][row.get(column) or '']
+            entries.pop()
+            bisect.insort(entries, entry)
+
+    def _load_files(self, files: list):
+        for file_path in files:
+            state = _FileState(partitions.partition_of_file(file_path))
+            try:
+                self._read_file(file_path, state)
+            except Exception as e:
+                logger.warning(f"Failed to load operator file {file_path}: {e}")
+                continue
+            self._files[file_path] = state
+
+    def _load_months(self, months: list):
+        """未読み込みの月のファイルを読み込む"""
+        months = [month for month in months if month not in self._loaded_months]
+        if not months:
+            return
+        for month in months:
+            manifest = partitions.load_manifest(self.data_dir, month)
+            if manifest is not None:
+                self._sealed[month] = manifest
+            self._load_files(partitions.partition_files(self.data_dir, month))
+            self._loaded_months.add(month)
+        self._rebuild_index()
+        logger.info(f"Call log partitions loaded: {', '.join(months)} ({len(self._by_id)} records in memory)")
+
+    def ensure_range(self, date_from: Optional[str] = None, date_to: Optional[str] = None):
+        """受電日時の範囲と重なる月だけを読み込む（範囲指定なしなら全ての月）"""
+        with self._lock:
+            if not self._loaded:
+                self.load()
+            if date_from or date_to:
+                months = partitions.partitions_in_range(self.data_dir, date_from, date_to)
+            else:
+                months = partitions.list_partitions(self.data_dir)
+            self._load_months(months)
+
+    def load(self):
+        """旧形式のファイルと当月のパーティションを読み込む（起動時）"""
+        with self._lock:
+            self._files = {}
+            self._loaded_months = set()
+            self._sealed = {}
+            self._load_files(partitions.legacy_files(self.data_dir))
+            self._load_months([partitions.current_partition()])
+            self._loaded = True
+            self._notify_invalidate()
+            self._last_reconciled = time.monotonic()
+            logger.info(f"Call log store loaded: {len(self._by_id)} records from {len(self._files)} operator files")
+
+    def unseal(self, month: str):
+        """締めた月への遅れた書き込みがあるため、変更確認の対象に戻す"""
+        with self._lock:
+            self._sealed.pop(month, None)
+
+    def reconcile(self, force: bool = False):
+        """ディスク上の変更を取り込む（追記は差分のみ、それ以外の変更はファイル単位で再読込）"""
+        with self._lock:
+            if not self._loaded:
+                self.load()
+                return
+            if not force and time.monotonic() - self._last_reconciled < self.reconcile_interval:
+                return
+            self._last_reconciled = time.monotonic()
+            # 月替わり後は新しい月も変更確認の対象にする
+            self._load_months([partitions.current_partition()])
+
+            changed = False
+            operator_files = self._operator_files()
+            tracked = {file_path for file_path, state in self._files.items() if state.month not in self._sealed}
+            for file_path in tracked - set(operator_files):
+                del self._files[file_path]
+                changed = True
+
+            appended = []
+            for file_path in operator_files:
+                state = self._files.get(file_path)
+                try:
+                    stat = os.stat(file_path)
+                    if state is not None and (stat.st_ino, stat.st_size, stat.st_mtime_ns) == (state.inode, state.offset, state.mtime_ns):
+                        continue
+
+                    if state is None or stat.st_ino != state.inode or stat.st_size < state.offset \
+                            or (stat.st_size == state.offset and stat.st_mtime_ns != state.mtime_ns):
+                        # 新規ファイル・置換・縮小・同サイズでの書き換えはファイル単位で読み直す
+                        logger.info(f"Operator file changed on disk, reloading: {file_path}")
+                        state = _FileState(partitions.partition_of_file(file_path))
+                        self._read_file(file_path, state)
+                        self._files[file_path] = state
+                        changed = True
+                    else:
+                        first_line = len(state.rows)
+                        source = self._source(file_path)
+                        appended.extend(
+                            (row, source, first_line + i)
+                            for i, row in enumerate(self._read_file(file_path, state))
+                        )
+                except FileNotFoundError:
+                    self._files.pop(file_path, None)
+                    changed = True
+                except Exception as e:
+                    logger.warning(f"Failed to reconcile operator file {file_path}: {e}")
+
+            if changed:
+                self._rebuild_index()
+                self._notify_invalidate()
+            else:
+                for row, source, line in appended:
+                    self._insert(row, source, line)
+                self._notify_record([row for row, _, _ in appended])
+
+    def record_append(self, file_path: Path, start: int, end: int, values: list):
+        """save_call_logが start〜end バイトに追記した1行を反映する"""
+        with self._lock:
+            if not self._loaded:
+                self.load()
+                return
+
+            month = partitions.partition_of_file(file_path)
+            if month is not None and month not in self._loaded_months:
+                # 未読み込みの月（過去月への遅れた書き込み・月替わり）はファイルごと読み込む
+                self._load_months([month])
+                return
+
+            state = self._files.get(str(file_path))
+            if state is None or state.offset != start:
+                # 新規ファイル、または他の書き込みが間に入っている場合は差分を読み込む
+                self.reconcile(force=True)
+                return
+
+            row = self._to_dict(values)
+            state.offset = end
+            state.mtime_ns = os.stat(file_path).st_mtime_ns
+            state.rows.append(row)
+            self._insert(row, self._source(file_path), len(state.rows) - 1)
+            self._notify_record([row])
+
+    def rows_in_month(self, month: str) -> list:
+        """指定月の行（未読み込みなら読み込む）"""
+        with self._lock:
+            if not self._loaded:
+                self.load()
+            self._load_months([month])
+            low, high = partitions.partition_bounds(month)
+            start = bisect.bisect_left(self._order, (low,))
+            end = bisect.bisect_right(self._order, (high, _MAX_SOURCE))
+            return [self._by_id[entry[-1]] for entry in self._order[start:end]]
+
+    def version(self) -> str:
+        """取り込み済みのファイル状態（inode・サイズ・mtime）から作るETag用の値。行は読まない"""
+        self.reconcile()
+        with self._lock:
+            signature = sorted(
+                (file_path, state.inode, state.offset, state.mtime_ns)
+                for file_path, state in self._files.items()
+            )
+        return hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()
+
+    def all_rows(self) -> list:
+        """受電日時順の全行"""
+        self.ensure_range()
+        self.reconcile()
+        with self._lock:
+            return [self._by_id[entry[-1]] for entry in self._order]
+
+    def rows_after(self, position: Optional[tuple], limit: int) -> tuple[list, Optional[tuple]]:
+        """受電日時順でpositionより後のlimit件と、最後の行の位置（全件を少しずつ読む用。ディスクの変更は取り込まない）"""
+        with self._lock:
+            start = 0 if position is None else bisect.bisect_right(self._order, position[:3] + (math.inf,))
+            entries = self._order[start:start + limit]
+            return [self._by_id[entry[-1]] for entry in entries], (entries[-1] if entries else None)
+
+    def query(
+        self,
+        filters: Optional[dict] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> tuple[list, Optional[str]]:
+        """条件に合う行を受電日時順で取得し、(行, 次ページのcursor) を返す
+
+        filtersは INDEXED_COLUMNS の列名 -> 値（完全一致）。date_from/date_toは受電日時の文字列範囲（両端含む）。
+        """
+        self.ensure_range(date_from, date_to)
+        self.reconcile()
+        lower = (date_from or '',)
+        upper = (date_to or _MAX_SOURCE, _MAX_SOURCE)
+        after = _decode_cursor(cursor) if cursor else None
+
+        with self._lock:
+            conditions = [(column, value) for column, value in (filters or {}).items() if value is not None]
+            if conditions:
+                # 最も件数の少ない値のインデックスを受電日時順に辿り、他の条件は行の値で確認する
+                candidates = sorted(
+                    ((self._indexes[column].get(value, []), column, value) for column, value in conditions),
+                    key=lambda candidate: len(candidate[0]),
+                )
+                entries = candidates[0][0]
+                others = [(column, value) for _, column, value in candidates[1:]]
+            else:
+                entries, others = self._order, []
+            start = bisect.bisect_left(entries, lower)
+            end = bisect.bisect_right(entries, upper)
+
+            if after is not None:
+                if descending:
+                    end = min(end, bisect.bisect_left(entries, after))
+                else:
+                    start = max(start, bisect.bisect_right(entries, after + (math.inf,)))
+
+            selected = []
+            for i in (range(end - 1, start - 1, -1) if descending else range(start, end)):
+                entry = entries[i]
+                row = self._by_id[entry[-1]]
+                if all((row.get(column) or '') == value for column, value in others):
+                    selected.append(entry)
+                    # 次のページがあるかを知るため1件多く探す
+                    if limit is not None and len(selected) > limit:
+                        break
+
+            has_more = limit is not None and len(selected) > limit
+            if has_more:
+                selected = selected[:limit]
+            next_cursor = _encode_cursor(selected[-1][:3]) if has_more else None
+            return [self._by_id[entry[-1]] for entry in selected], next_cursor
+
+    def __len__(self) -> int:
+        return len(self._by_id)
@@ -0,0 +1,195 @@
+# service/call_log_writer.py
+
+import asyncio
+import csv
+import fcntl
+import io
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+from service.process_coordination import SequenceAllocator
+
+logger = logging.getLogger(__name__)
+
+class _Record:
+    __slots__ = ("file_path", "values", "future", "loop")
+
+    def __init__(self, file_path: Path, values: list, future: asyncio.Future, loop: asyncio.AbstractEventLoop):
+        self.file_path = file_path
+        self.values = values
+        self.future = future
+        self.loop = loop
+
+def _set_future(future: asyncio.Future, error: Optional[BaseException]):
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
+
+class CallLogWriter:
+    """受電履歴の追記を専用スレッドでまとめて書き込む（グループコミット）
+
+    - save_call_logはキューに積んで完了を待つだけで、イベントループはディスクI/Oで止まらない
+    - コミット窓の間に届いた記録をまとめ、ファイル毎に1回の書き込みと1回のfsyncで永続化する
+    - 各リクエストは自分の記録がfsyncされてから完了する（fsync=Falseの開発用モードではOSへの書き込みまで）
+    """
+
+    def __init__(
+        self,
+        headers: list,
+        commit_window_seconds: float,
+        max_batch: int,
+        fsync: bool,
+        on_append: Callable[[Path, int, int, list], None],
+        encoding: str = "cp932",
+        sequence: Optional[SequenceAllocator] = None,
+    ):
+        self.headers = headers
+        self.commit_window_seconds = commit_window_seconds
+        self.max_batch = max_batch
+        self.fsync = fsync
+        self.on_append = on_append
+        self.encoding = encoding
+        # 指定時は各行の末尾に連番を付ける（ファイルロック中に払い出すので、ファイル内でも昇順になる）
+        self.sequence = sequence
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.records = 0
+        self.fsyncs = 0
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="call-log-writer", daemon=True)
+                self._thread.start()
+
+    async def append(self, file_path: Path, values: list):
+        """1行の追記を依頼し、永続化されるまで待つ"""
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put(_Record(file_path, values, future, loop))
+        await future
+
+    def close(self, timeout: float = 10.0):
+        """キューに残った記録を書き終えてからスレッドを止める（shutdown時）"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                return
+
+            # 最初の1件からコミット窓の間に届いた分をまとめる
+            batch = [record]
+            stopping = False
+            deadline = time.monotonic() + self.commit_window_seconds
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    record = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+
+            self._commit(batch)
+            if stopping:
+                return
+
+    def _encode(self, values: list) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(values)
+        return buffer.getvalue().encode(self.encoding)
+
+    def _commit(self, batch: list):
+        by_file: dict = {}
+        for record in batch:
+            try:
+                self._encode(record.values)
+            except Exception as e:
+                # 文字コードに変換できない記録だけを失敗させる
+                self._resolve(record, e)
+                continue
+            by_file.setdefault(record.file_path, []).append(record)
+
+        for file_path, records in by_file.items():
+            try:
+                offsets = self._write_file(file_path, records)
+            except Exception as e:
+                logger.error(f"Failed to write call logs to {file_path}: {e}")
+                for record in records:
+                    self._resolve(record, e)
+                continue
+
+            for record, (start, end) in zip(records, offsets):
+                try:
+                    self.on_append(file_path, start, end, record.values)
+                except Exception as e:
+                    logger.warning(f"Failed to apply call log to memory store: {e}")
+                self._resolve(record, None)
+
+        self.batches += 1
+        self.records += len(batch)
+
+    def _resolve(self, record: _Record, error: Optional[BaseException]):
+        try:
+            record.loop.call_soon_threadsafe(_set_future, record.future, error)
+        except RuntimeError:
+            # 待っていたイベントループが既に終了している
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "records": self.records,
+            "fsyncs": self.fsyncs,
+            "avg_batch_size": round(self.records / self.batches, 2) if self.batches else 0.0,
+            "fsync": self.fsync,
+        }
+
+    def _write_file(self, file_path: Path, records: list) -> list:
+        """ファイルロックを取り、まとめて追記して各行の (開始, 終了) バイト位置を返す"""
+        with open(file_path, "ab") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                position = os.fstat(f.fileno()).st_size
+                header = b""
+                if position == 0:
+                    header = self._encode(self.headers)
+                    position = len(header)
+                    logger.info(f"Operator call log file created: {file_path}")
+
+                if self.sequence is not None:
+                    first = self.sequence.allocate(len(records))
+                    for i, record in enumerate(records):
+                        record.values = record.values + [str(first + i)]
+                chunks = [self._encode(record.values) for record in records]
+
+                offsets = []
+                for data in chunks:
+                    offsets.append((position, position + len(data)))
+                    position += len(data)
+                f.write(header + b"".join(chunks))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+                    self.fsyncs += 1
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return offsets
@@ -0,0 +1,43 @@
+import hashlib
+import hmac
+import logging
+import os
+import time
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class CredentialCache:
+    """WebInsourceでログインを確認できた認証情報を、パスワードのソルト付きハッシュのみでTTL付き保持"""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        # login_id -> (確認時刻, ソルト, ハッシュ)
+        self._entries: dict = {}
+
+    def _hash(self, password: str, salt: bytes) -> bytes:
+        return hashlib.sha256(salt + password.encode("utf-8")).digest()
+
+    def verify(self, login_id: str, password: str) -> bool:
+        """有効期限内に同じパスワードでログインを確認済みか"""
+        entry = self._entries.get(login_id)
+        if entry is None:
+            return False
+
+        verified_at, salt, digest = entry
+        if time.monotonic() - verified_at > self.ttl_seconds:
+            del self._entries[login_id]
+            return False
+        return hmac.compare_digest(digest, self._hash(password, salt))
+
+    def remember(self, login_id: str, password: str):
+        """ログイン成功時に記録"""
+        salt = os.urandom(16)
+        self._entries[login_id] = (time.monotonic(), salt, self._hash(password, salt))
+
+    def invalidate(self, login_id: str):
+        """ログイン失敗（パスワード変更等）を検知したら破棄"""
+        if self._entries.pop(login_id, None) is not None:
+            logger.info(f"Verified credential invalidated: {login_id}")
+
+credential_cache = CredentialCache(ttl_seconds=settings.CREDENTIAL_CACHE_TTL_SECONDS)
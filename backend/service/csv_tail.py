@@ -0,0 +1,28 @@
+# service/csv_tail.py
+
+import csv
+import fcntl
+import io
+import os
+from pathlib import Path
+
+def read_appended_rows(file_path: Path, offset: int, encoding: str = "cp932") -> tuple[list[list[str]], int, int]:
+    """CSVのoffsetバイト目以降に追記された行を取得
+
+    書き込み側は1レコード単位で排他ロックを取って追記するため、共有ロックを待ってから読めば
+    途中までしか書かれていない行を読むことはない。offsetが0の場合はヘッダー行を除く。
+    戻り値は (行のリスト, 読み終えた位置, inode)。
+    """
+    with open(file_path, "rb") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+        try:
+            inode = os.fstat(f.fileno()).st_ino
+            f.seek(offset)
+            data = f.read()
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    rows = [row for row in csv.reader(io.StringIO(data.decode(encoding), newline="")) if row]
+    if offset == 0 and rows:
+        rows = rows[1:]
+    return rows, offset + len(data), inode
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class DetailCache:
+    """スクレイピング結果のTTL付きLRUキャッシュ。同一キーの同時リクエストは1回の取得を共有する"""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # key -> (有効期限, 値)
+        self._entries: OrderedDict = OrderedDict()
+        # key -> 取得中のFuture
+        self._inflight: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """有効期限内の値を取得"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if time.monotonic() > expires_at:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[int] = None):
+        """値を保存し、上限超過分を古い順に破棄"""
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl_seconds)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def ensure_capacity(self, max_entries: int):
+        """上限がmax_entries未満なら引き上げる（事前取得の対象件数に合わせる）"""
+        self.max_entries = max(self.max_entries, max_entries)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], refresh: bool = False, ttl: Optional[int] = None) -> Any:
+        """キャッシュから取得し、無ければloaderで取得して保存する
+
+        refresh=Trueでもキャッシュは使わないが、実行中の同一取得があればその結果を共有する。
+        """
+        if not refresh:
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        # 待ち合わせ側がいない場合の「未取得の例外」警告を抑止
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            value = await loader()
+            self.put(key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+detail_cache = DetailCache(
+    ttl_seconds=settings.DETAIL_CACHE_TTL_SECONDS,
+    max_entries=settings.DETAIL_CACHE_MAX_ENTRIES,
+)
+
+# 事前取得の結果（当日の全件を保持するため、利用者の取得結果のLRUとは分ける）
+prefetch_cache = DetailCache(
+    ttl_seconds=settings.PREFETCH_CACHE_TTL_SECONDS,
+    max_entries=settings.PREFETCH_CACHE_MAX_ENTRIES,
+)
+
+def get_cached(key: Hashable) -> Optional[Any]:
+    """利用者の取得結果、無ければ事前取得の結果を返す"""
+    value = detail_cache.get(key)
+    return value if value is not None else prefetch_cache.get(key)
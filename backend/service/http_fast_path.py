@@ -0,0 +1,264 @@
+# service/http_fast_path.py
+
+import logging
+import time
+from http.cookiejar import DefaultCookiePolicy
+from typing import Optional
+from urllib.parse import urljoin
+import httpx
+from lxml import html as lxml_html
+from config.settings import settings
+from service.session_cache import SessionCache, session_cache
+
+logger = logging.getLogger(__name__)
+
+BLOCK_TAGS = {"div", "p", "li", "tr", "table", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6"}
+LINE_BREAK = "\x00"
+MAX_REDIRECTS = 10
+TABLE_BORDERED = "contains(concat(' ', normalize-space(@class), ' '), ' table-bordered ')"
+
+class LayoutChangedError(Exception):
+    """HTMLの構造が想定と異なる（Playwright経由へフォールバックする）"""
+
+def _parse(document: str):
+    """HTMLを解析し、br・ブロック要素の後ろに改行の目印を入れておく"""
+    root = lxml_html.fromstring(document)
+    for el in root.iter():
+        if isinstance(el.tag, str) and (el.tag == "br" or el.tag in BLOCK_TAGS):
+            el.tail = LINE_BREAK + (el.tail or "")
+    return root
+
+def _inner_text(el) -> str:
+    """ブラウザのinnerTextに近い形でテキストを取得（br・ブロック要素は改行、他の空白は1つに畳む）"""
+    text = " ".join(el.text_content().split())
+    lines = [line.strip() for line in text.split(LINE_BREAK)]
+    return "\n".join(lines).strip()
+
+def _cell(td) -> dict:
+    """page_extractorと同じ形式のセルデータ"""
+    imgs = td.xpath(".//img")
+    links = [
+        {"href": a.get("href") or "", "text": _inner_text(a)}
+        for a in td.xpath(".//a")
+    ]
+    return {
+        "text": _inner_text(td),
+        "img": (imgs[0].get("src") or "") if imgs else "",
+        "links": links,
+    }
+
+def _body_rows(table, direct: bool) -> list:
+    """tbody配下の行（lxmlはtbodyを補完しないため、無い場合はtable直下の行）"""
+    if table.xpath("./tbody"):
+        return table.xpath("./tbody/tr" if direct else "./tbody//tr")
+    return table.xpath("./tr[td]" if direct else ".//tr[td]")
+
+def parse_detail_html(document: str) -> tuple[dict, list[list[dict]]]:
+    """研修詳細ページのHTMLから基本情報と受講者一覧の行データを取得"""
+    root = _parse(document)
+
+    basic_tables = root.xpath(f"//table[{TABLE_BORDERED}][count(preceding-sibling::table)=0]")
+    if not basic_tables:
+        raise LayoutChangedError("基本情報テーブルが見つかりません")
+
+    detail_data = {}
+    for table in basic_tables:
+        for tr in table.xpath(".//tr"):
+            th = tr.xpath("(.//th)[1]")
+            td = tr.xpath("(.//td)[1]")
+            if th and td:
+                detail_data[_inner_text(th[0])] = _inner_text(td[0])
+    if not detail_data:
+        raise LayoutChangedError("基本情報が取得できません")
+
+    rows = []
+    plan = root.xpath("//table[@id='plan']")
+    if plan:
+        rows = [[_cell(td) for td in tr.xpath(".//td")] for tr in _body_rows(plan[0], direct=False)]
+    return detail_data, rows
+
+def parse_trainee_html(document: str) -> list[list[dict]]:
+    """受講者検索結果のHTMLから受講者テーブルの行データを取得"""
+    root = _parse(document)
+    tables = root.xpath(f"//table[{TABLE_BORDERED}]")
+    if not tables:
+        raise LayoutChangedError("受講者テーブルが見つかりません")
+    return [[_cell(td) for td in tr.xpath(".//td")] for tr in _body_rows(tables[0], direct=True)]
+
+def _form_fields(form) -> dict:
+    """ブラウザの送信内容と同じになるようフォームの入力値を収集"""
+    fields = {}
+    for el in form.xpath(".//input[@name] | .//select[@name] | .//textarea[@name]"):
+        name = el.get("name")
+        if el.tag == "input":
+            input_type = (el.get("type") or "text").lower()
+            if input_type in ("submit", "button", "image", "reset", "file"):
+                continue
+            if input_type in ("checkbox", "radio") and el.get("checked") is None:
+                continue
+            fields[name] = el.get("value") or ""
+        elif el.tag == "select":
+            options = el.xpath(".//option[@selected]") or el.xpath(".//option")
+            if options:
+                fields[name] = options[0].get("value", options[0].text_content())
+        else:
+            fields[name] = el.text_content()
+    return fields
+
+class HttpFastPath:
+    """Playwrightでログイン済みのセッションCookieを使い、詳細ページをHTTPで直接取得する"""
+
+    def __init__(self, sessions: SessionCache, timeout: float, max_connections: int):
+        self.sessions = sessions
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            # リダイレクトはセッションのCookieを付け直すため_requestで辿る
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=False,
+                limits=httpx.Limits(max_connections=self.max_connections),
+            )
+            # 共有クライアントなので、レスポンスのCookieを他ユーザーへ持ち越さない
+            self._client.cookies.jar.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _session_cookies(self, state: dict) -> httpx.Cookies:
+        """storage_stateのCookieからセッション専用のCookie Jarを作る"""
+        cookies = httpx.Cookies()
+        for c in state.get("cookies", []):
+            cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+        return cookies
+
+    def _updated_state(self, state: dict, cookies: httpx.Cookies) -> Optional[dict]:
+        """レスポンスで変わった・増えたCookieを反映したstorage_state。変更が無ければNone"""
+        stored = {(c["name"], c.get("domain", ""), c.get("path", "/")): c for c in state.get("cookies", [])}
+        updated = dict(stored)
+        for cookie in cookies.jar:
+            key = (cookie.name, cookie.domain, cookie.path)
+            previous = stored.get(key)
+            if previous is not None and previous["value"] == cookie.value:
+                continue
+            entry = dict(previous) if previous is not None else {
+                "name": cookie.name,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "expires": cookie.expires if cookie.expires is not None else -1,
+                "httpOnly": False,
+                "secure": cookie.secure,
+                "sameSite": "Lax",
+            }
+            entry["value"] = cookie.value
+            updated[key] = entry
+        if updated == stored:
+            return None
+        return {**state, "cookies": list(updated.values())}
+
+    def _is_logged_out(self, response: httpx.Response, root) -> bool:
+        if response.url.path.rstrip("/").endswith("/top"):
+            return True
+        return bool(root.xpath("//input[@id='login_id']"))
+
+    async def _request(self, login_id: str, password: str, method: str, url: str, **kwargs) -> Optional[str]:
+        """セッションCookie付きでリクエスト。セッションが無い・切れている場合はNone"""
+        state = self.sessions.get(login_id, password)
+        if state is None:
+            return None
+
+        client = self._get_client()
+        cookies = self._session_cookies(state)
+        request = client.build_request(method, url, **kwargs)
+        for _ in range(MAX_REDIRECTS + 1):
+            # リダイレクト先にもセッションのCookieを付け、Set-Cookieで更新された値を引き継ぐ
+            cookies.set_cookie_header(request)
+            response = await client.send(request)
+            cookies.extract_cookies(response)
+            if not response.has_redirect_location:
+                break
+            location = urljoin(str(request.url), response.headers["location"])
+            if response.status_code in (307, 308):
+                request = client.build_request(method, location, **kwargs)
+            else:
+                request = client.build_request("GET", location)
+        else:
+            raise httpx.TooManyRedirects("リダイレクトが多すぎます", request=request)
+        response.raise_for_status()
+
+        if self._is_logged_out(response, lxml_html.fromstring(response.text)):
+            logger.info(f"HTTP fast path: session expired: {login_id}")
+            self.sessions.invalidate(login_id, password)
+            return None
+
+        updated = self._updated_state(state, cookies)
+        if updated is not None:
+            self.sessions.put(login_id, password, updated)
+        return response.text
+
+    async def fetch_detail(self, web_id: str, login_id: str, password: str) -> Optional[tuple[dict, list[list[dict]]]]:
+        """研修詳細をHTTPで取得。取得できない場合はNone（Playwright経由へフォールバック）"""
+        url = f"{settings.WEBINSOURCE_MANAGE_URL}/{web_id}"
+        started = time.perf_counter()
+        try:
+            document = await self._request(login_id, password, "GET", url)
+            if document is None:
+                return None
+            result = parse_detail_html(document)
+            logger.info(f"HTTP fast path: detail {web_id} in {(time.perf_counter() - started) * 1000:.0f}ms")
+            return result
+        except LayoutChangedError as e:
+            logger.warning(f"HTTP fast path: layout changed, falling back to browser: {web_id} - {e}")
+        except Exception as e:
+            logger.warning(f"HTTP fast path failed, falling back to browser: {web_id} - {e}")
+        return None
+
+    async def fetch_trainees(self, application_id: str, login_id: str, password: str) -> Optional[list[list[dict]]]:
+        """受講者検索をHTTPで実行。取得できない場合はNone（Playwright経由へフォールバック）"""
+        started = time.perf_counter()
+        try:
+            document = await self._request(login_id, password, "GET", settings.WEBINSOURCE_TRAINEE_URL)
+            if document is None:
+                return None
+
+            root = lxml_html.fromstring(document)
+            forms = root.xpath("//input[@id='TrainingIDText']/ancestor::form[1]")
+            field = root.xpath("//input[@id='TrainingIDText']/@name")
+            if not forms or not field:
+                raise LayoutChangedError("受講者検索フォームが見つかりません")
+
+            form = forms[0]
+            data = _form_fields(form)
+            data[field[0]] = application_id
+            buttons = root.xpath("//*[@id='btnSearch'][@name]")
+            if buttons:
+                data[buttons[0].get("name")] = buttons[0].get("value") or ""
+
+            action = urljoin(settings.WEBINSOURCE_TRAINEE_URL, form.get("action") or "")
+            if (form.get("method") or "get").lower() == "post":
+                document = await self._request(login_id, password, "POST", action, data=data)
+            else:
+                document = await self._request(login_id, password, "GET", action, params=data)
+            if document is None:
+                return None
+
+            result = parse_trainee_html(document)
+            logger.info(f"HTTP fast path: trainees {application_id} in {(time.perf_counter() - started) * 1000:.0f}ms")
+            return result
+        except LayoutChangedError as e:
+            logger.warning(f"HTTP fast path: layout changed, falling back to browser: {application_id} - {e}")
+        except Exception as e:
+            logger.warning(f"HTTP fast path failed, falling back to browser: {application_id} - {e}")
+        return None
+
+http_fast_path = HttpFastPath(
+    sessions=session_cache,
+    timeout=settings.HTTP_FAST_PATH_TIMEOUT,
+    max_connections=settings.HTTP_FAST_PATH_MAX_CONNECTIONS,
+)
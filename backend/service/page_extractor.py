@@ -0,0 +1,98 @@
+# service/page_extractor.py
+
+import logging
+from typing import Optional
+from playwright.async_api import Page
+
+logger = logging.getLogger(__name__)
+
+# テーブル行を1回のpage.evaluateでまとめて取得する
+# 各セルは {text, img, links: [{href, text}]} 形式
+TABLE_ROWS_JS = """
+([tableSelector, rowSelector]) => {
+    const table = document.querySelector(tableSelector);
+    if (!table) return null;
+    return Array.from(table.querySelectorAll(rowSelector)).map(tr =>
+        Array.from(tr.querySelectorAll("td")).map(td => {
+            const img = td.querySelector("img");
+            return {
+                text: td.innerText.trim(),
+                img: img ? (img.getAttribute("src") || "") : "",
+                links: Array.from(td.querySelectorAll("a")).map(a => ({
+                    href: a.getAttribute("href") || "",
+                    text: a.innerText,
+                })),
+            };
+        })
+    );
+}
+"""
+
+# th/tdの組を1回のpage.evaluateでまとめて取得する
+KEY_VALUE_JS = """
+(rowSelector) => Array.from(document.querySelectorAll(rowSelector))
+    .map(tr => [tr.querySelector("th"), tr.querySelector("td")])
+    .filter(([th, td]) => th && td)
+    .map(([th, td]) => [th.innerText.trim(), td.innerText.trim()])
+"""
+
+async def extract_table_rows(page: Page, table_selector: str, row_selector: str) -> Optional[list[list[dict]]]:
+    """テーブルの全行をセル単位の構造化データで取得（テーブルが無ければNone）"""
+    try:
+        return await page.evaluate(TABLE_ROWS_JS, [table_selector, row_selector])
+    except Exception as e:
+        logger.warning(f"一括抽出に失敗したため要素単位で取得します: {table_selector} - {e}")
+        return await _extract_table_rows_by_element(page, table_selector, row_selector)
+
+async def extract_key_value_rows(page: Page, row_selector: str) -> dict:
+    """th/tdの組を辞書で取得"""
+    try:
+        pairs = await page.evaluate(KEY_VALUE_JS, row_selector)
+        return {key: value for key, value in pairs}
+    except Exception as e:
+        logger.warning(f"一括抽出に失敗したため要素単位で取得します: {row_selector} - {e}")
+        return await _extract_key_value_rows_by_element(page, row_selector)
+
+async def _extract_table_rows_by_element(page: Page, table_selector: str, row_selector: str) -> Optional[list[list[dict]]]:
+    """従来の要素単位での取得（フォールバック）"""
+    table = await page.query_selector(table_selector)
+    if not table:
+        return None
+
+    rows = []
+    for tr in await table.query_selector_all(row_selector):
+        cells = []
+        for td in await tr.query_selector_all("td"):
+            img = await td.query_selector("img")
+            links = []
+            for a in await td.query_selector_all("a"):
+                links.append({
+                    "href": await a.get_attribute("href") or "",
+                    "text": await a.inner_text(),
+                })
+            cells.append({
+                "text": (await td.inner_text()).strip(),
+                "img": (await img.get_attribute("src") or "") if img else "",
+                "links": links,
+            })
+        rows.append(cells)
+    return rows
+
+async def _extract_key_value_rows_by_element(page: Page, row_selector: str) -> dict:
+    """従来の要素単位での取得（フォールバック）"""
+    data = {}
+    for row in await page.query_selector_all(row_selector):
+        th = await row.query_selector("th")
+        td = await row.query_selector("td")
+        if th and td:
+            key = (await th.inner_text()).strip()
+            value = (await td.inner_text()).strip()
+            data[key] = value
+    return data
+
+async def is_session_expired(page: Page) -> bool:
+    """トップ（ログイン画面）へリダイレクトされていればセッション切れ"""
+    path = page.url.split("?")[0].rstrip("/")
+    if path.endswith("/top"):
+        return True
+    return await page.query_selector("#login_id") is not None
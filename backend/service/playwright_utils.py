@@ -1,17 +1,19 @@
 # service/playwright_utils.py
 
-from playwright.async_api import async_playwright, Page, TimeoutError
+from contextlib import asynccontextmanager
+from playwright.async_api import Page, TimeoutError
 from config.settings import settings
+from service.browser_manager import browser_pool
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def launch_browser():
-    p = await async_playwright().start()
-    browser = await p.chromium.launch(headless=True)
-    context = await browser.new_context()
-    page = await context.new_page()
-    return p, browser, context, page
+@asynccontextmanager
+async def launch_browser(**context_options):
+    """常駐ブラウザプールから独立したコンテキストのページを取得"""
+    async with browser_pool.context(**context_options) as context:
+        page = await context.new_page()
+        yield page
 
 async def login_to_webinsource(page: Page, login_id: str, password: str) -> bool:
     try:
@@ -30,9 +32,5 @@ async def login_to_webinsource(page: Page, login_id: str, password: str) -> bool
         return False
 
 async def try_login(login_id: str, password: str) -> bool:
-    p, browser, context, page = await launch_browser()
-    try:
+    async with launch_browser() as page:
         return await login_to_webinsource(page, login_id, password)
-    finally:
-        await browser.close()
-        await p.stop()
@@ -0,0 +1,137 @@
+# service/prefetch_service.py
+
+import asyncio
+import csv
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from config.settings import settings
+from service.detail_cache import DetailCache, prefetch_cache
+from service.process_coordination import WriterElection
+from service.scheduler import PRIORITY_LOW
+from service.trainee_detail_service import scrape_trainee_detail_handler
+from service.training_detail_service import scrape_detail_batch
+from utils.training_files import get_today_merged_csv_path
+
+logger = logging.getLogger(__name__)
+
+def read_web_ids(file_path: Path) -> list[str]:
+    """マージ済みCSVからWeb連携IDを重複なしで取得"""
+    with open(file_path, encoding="cp932") as f:
+        reader = csv.DictReader(f)
+        ids = (row.get("Web連携ID", "").strip() for row in reader)
+        return list(dict.fromkeys(i for i in ids if i))
+
+class DetailPrefetcher:
+    """当日のマージ済みCSVが出力されたら、研修詳細と受講者一覧を事前取得してキャッシュを温める
+
+    ダウンロードジョブは別プロセスで動くため、キャッシュを持つAPIプロセス側でCSVの更新を検知して実行する。
+    複数ワーカーで同じ取得を重ねないよう、ロックファイルで選ばれた1プロセスだけが実行する。
+    """
+
+    def __init__(self, login_id: str, password: str, poll_seconds: int, concurrency: int, interval_seconds: float, include_trainees: bool, cache: DetailCache, lock_path: Path):
+        self.login_id = login_id
+        self.password = password
+        self.poll_seconds = poll_seconds
+        self.concurrency = concurrency
+        self.interval_seconds = interval_seconds
+        self.include_trainees = include_trainees
+        self.cache = cache
+        self.lock_path = lock_path
+        self.election: Optional[WriterElection] = None
+        self._last_prefetched: Optional[tuple] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.login_id and self.password)
+
+    def start(self):
+        """lifespanから起動。認証情報が未設定なら何もしない"""
+        if not self.enabled:
+            logger.info("Prefetch disabled: PREFETCH_LOGIN_ID / PREFETCH_PASSWORD not set")
+            return
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        self.election = WriterElection(self.lock_path)
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.election:
+            self.election.release()
+
+    async def _watch(self):
+        while True:
+            try:
+                # 担当プロセスが終了していれば引き継ぐ
+                if not self.election.try_acquire():
+                    await asyncio.sleep(self.poll_seconds)
+                    continue
+                file_path = get_today_merged_csv_path()
+                if file_path.exists():
+                    signature = (file_path.name, file_path.stat().st_mtime_ns)
+                    if signature != self._last_prefetched:
+                        # 失敗しても同じファイルで繰り返さない
+                        self._last_prefetched = signature
+                        await self.prefetch(read_web_ids(file_path))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"事前取得に失敗しました: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def prefetch(self, web_ids: list[str]):
+        """研修詳細を低並列で取得し、各受講者の受講者一覧を間隔を空けて取得"""
+        if not web_ids:
+            return
+        logger.info(f"事前取得開始: {len(web_ids)}件")
+        started = datetime.now()
+        self.cache.ensure_capacity(len(web_ids))
+
+        application_ids = []
+        fetched, failed = 0, 0
+        items = await scrape_detail_batch(
+            web_ids, self.login_id, self.password,
+            concurrency=self.concurrency, priority=PRIORITY_LOW, cache=self.cache
+        )
+        async for item in items:
+            if not item.success:
+                failed += 1
+                continue
+            fetched += 1
+            application_ids.extend(a.申込No for a in item.data.受講者一覧 if a.申込No)
+
+        if self.include_trainees:
+            application_ids = list(dict.fromkeys(application_ids))
+            self.cache.ensure_capacity(len(web_ids) + len(application_ids))
+            for application_id in application_ids:
+                try:
+                    await scrape_trainee_detail_handler(
+                        application_id, self.login_id, self.password,
+                        priority=PRIORITY_LOW, cache=self.cache
+                    )
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"受講者一覧の事前取得に失敗: {application_id} - {e}")
+                await asyncio.sleep(self.interval_seconds)
+
+        elapsed = (datetime.now() - started).total_seconds()
+        logger.info(f"事前取得完了: 研修{fetched}件, 受講者一覧{len(set(application_ids))}件, 失敗{failed}件, {elapsed:.1f}秒")
+
+detail_prefetcher = DetailPrefetcher(
+    login_id=settings.PREFETCH_LOGIN_ID,
+    password=settings.PREFETCH_PASSWORD,
+    poll_seconds=settings.PREFETCH_POLL_SECONDS,
+    concurrency=settings.PREFETCH_CONCURRENCY,
+    interval_seconds=settings.PREFETCH_INTERVAL_SECONDS,
+    include_trainees=settings.PREFETCH_TRAINEES,
+    cache=prefetch_cache,
+    lock_path=settings.DOWNLOADS_DIR / ".prefetch.lock",
+)
@@ -0,0 +1,80 @@
+# service/process_coordination.py
+
+import fcntl
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class WriterElection:
+    """複数ワーカー（uvicorn --workers）の中から、共有ファイルを書き換えるプロセスを1つに決める
+
+    ロックファイルの排他ロックを取れたプロセスが担当になり、プロセスが終了するとOSがロックを外すので
+    残ったプロセスのどれかが次の try_acquire で引き継ぐ。
+    """
+
+    def __init__(self, lock_path: Path):
+        self.lock_path = lock_path
+        self._fd: Optional[int] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode("ascii"))
+        self._fd = fd
+        logger.info(f"Elected as writer process: {self.lock_path.name} (pid={os.getpid()})")
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+class SequenceAllocator:
+    """プロセスをまたいで単調増加する連番を払い出す（カウンタファイルを排他ロックして加算）"""
+
+    def __init__(self, path: Path, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+
+    def _update(self, func) -> int:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            data = os.pread(fd, 64, 0).strip()
+            current = int(data) if data else 0
+            updated = func(current)
+            if updated != current:
+                encoded = str(updated).encode("ascii")
+                os.pwrite(fd, encoded, 0)
+                os.ftruncate(fd, len(encoded))
+                if self.fsync:
+                    os.fsync(fd)
+            return updated
+        finally:
+            os.close(fd)
+
+    def allocate(self, count: int) -> int:
+        """count個分を確保し、先頭の番号を返す（番号は1から）"""
+        return self._update(lambda current: current + count) - count + 1
+
+    def ensure_at_least(self, value: int):
+        """カウンタファイルが失われた場合などに、既存の最大値より小さい番号を払い出さないようにする"""
+        self._update(lambda current: max(current, value))
+
+    def current(self) -> int:
+        return self._update(lambda current: current)
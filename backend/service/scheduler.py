@@ -0,0 +1,186 @@
+# service/scheduler.py
+
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Optional
+from config.settings import settings
+from utils.error_handler import ServiceOverloadedError
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = 1
+
+# 待ち時間・処理時間の移動平均の重み
+EWMA_ALPHA = 0.2
+
+class _Waiter:
+    __slots__ = ("login_id", "future", "enqueued_at")
+
+    def __init__(self, login_id: str, future: asyncio.Future):
+        self.login_id = login_id
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+class BrowserScheduler:
+    """ブラウザを使う処理（ログイン・研修詳細・受講者一覧・ダウンロード）の受付制御
+
+    - 全体の同時実行数の上限と、待ち行列の上限
+    - 待ち行列はlogin_id毎に分け、順番に1件ずつ割り当てる（同一オペレーターの連打で他が詰まらない）
+    - 優先度の低い処理（事前取得）は通常の待ちが無い時だけ実行
+    - 推定待ち時間がリクエストの制限時間を超える場合は即座に拒否（429 + Retry-After）
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, default_timeout: float, initial_service_seconds: float = 5.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+        self._running = 0
+        self._waiting = 0
+        # 優先度 -> (login_id -> 待ち行列)
+        self._queues: dict = {PRIORITY_NORMAL: OrderedDict(), PRIORITY_LOW: OrderedDict()}
+        self._avg_service_seconds = initial_service_seconds
+        self._avg_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def estimate_wait(self, priority: int = PRIORITY_NORMAL) -> float:
+        """同じか高い優先度の待ち件数と平均処理時間から、新規リクエストの待ち時間を推定"""
+        ahead = sum(
+            len(queue)
+            for level, queues in self._queues.items() if level <= priority
+            for queue in queues.values()
+        )
+        if ahead == 0 and self._running < self.max_concurrency:
+            return 0.0
+        return (ahead // self.max_concurrency + 1) * self._avg_service_seconds
+
+    def _reject(self, reason: str, estimated_wait: float):
+        self.rejected += 1
+        retry_after = max(1, math.ceil(estimated_wait))
+        logger.warning(f"Scheduler rejected: {reason} (estimated_wait={estimated_wait:.1f}s, waiting={self._waiting})")
+        raise ServiceOverloadedError("混雑しているため処理できません。しばらくしてから再度お試しください", retry_after)
+
+    def _record_wait(self, waited: float):
+        self.admitted += 1
+        self._avg_wait_seconds += EWMA_ALPHA * (waited - self._avg_wait_seconds)
+        self._max_wait_seconds = max(self._max_wait_seconds, waited)
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        for level in sorted(self._queues):
+            queues = self._queues[level]
+            while queues:
+                login_id, queue = next(iter(queues.items()))
+                waiter = queue.popleft()
+                self._waiting -= 1
+                if queue:
+                    # 次は別のlogin_idの順番
+                    queues.move_to_end(login_id)
+                else:
+                    del queues[login_id]
+                if not waiter.future.done():
+                    return waiter
+        return None
+
+    def _dispatch(self):
+        while self._running < self.max_concurrency:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self._running += 1
+            waiter.future.set_result(None)
+
+    def _remove(self, waiter: _Waiter, priority: int):
+        queues = self._queues[priority]
+        queue = queues.get(waiter.login_id)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            self._waiting -= 1
+            if not queue:
+                del queues[waiter.login_id]
+
+    def _release(self, started_at: Optional[float]):
+        self._running -= 1
+        if started_at is not None:
+            service = time.monotonic() - started_at
+            self._avg_service_seconds += EWMA_ALPHA * (service - self._avg_service_seconds)
+        self._dispatch()
+
+    async def _acquire(self, login_id: str, timeout: float, priority: int):
+        if self._waiting == 0 and self._running < self.max_concurrency:
+            self._running += 1
+            self._record_wait(0.0)
+            return
+
+        estimated_wait = self.estimate_wait(priority)
+        if self._waiting >= self.max_queue:
+            self._reject("queue full", estimated_wait)
+        if estimated_wait > timeout:
+            self._reject("deadline", estimated_wait)
+
+        waiter = _Waiter(login_id, asyncio.get_running_loop().create_future())
+        self._queues[priority].setdefault(login_id, deque()).append(waiter)
+        self._waiting += 1
+        try:
+            if math.isinf(timeout):
+                await waiter.future
+            else:
+                await asyncio.wait_for(waiter.future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 割り当てと同時に諦めた場合は枠を返す
+                self._release(None)
+            else:
+                self._remove(waiter, priority)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                self._reject("wait timeout", self.estimate_wait(priority))
+            raise
+        self._record_wait(time.monotonic() - waiter.enqueued_at)
+
+    @asynccontextmanager
+    async def slot(self, login_id: str, timeout: Optional[float] = None, priority: int = PRIORITY_NORMAL, batch: bool = False):
+        """実行枠を確保。timeoutはこのリクエストが待てる秒数（未指定なら通常は既定値、低優先度は無制限）
+
+        推定待ち時間は通常優先度の1ページ分の処理時間で見積もるため、
+        低優先度や複数ページをまとめて処理する枠（batch=True）の処理時間は平均に含めない。
+        """
+        if timeout is None:
+            timeout = self.default_timeout if priority == PRIORITY_NORMAL else math.inf
+        await self._acquire(login_id, timeout, priority)
+        started_at = time.monotonic() if priority == PRIORITY_NORMAL and not batch else None
+        try:
+            yield
+        finally:
+            self._release(started_at)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "running": self._running,
+            "waiting": self._waiting,
+            "waiting_by_priority": {
+                level: sum(len(queue) for queue in queues.values())
+                for level, queues in self._queues.items()
+            },
+            "waiting_login_ids": sum(len(queues) for queues in self._queues.values()),
+            "avg_wait_seconds": round(self._avg_wait_seconds, 3),
+            "max_wait_seconds": round(self._max_wait_seconds, 3),
+            "avg_service_seconds": round(self._avg_service_seconds, 3),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+browser_scheduler = BrowserScheduler(
+    max_concurrency=settings.SCHEDULER_MAX_CONCURRENCY,
+    max_queue=settings.SCHEDULER_MAX_QUEUE,
+    default_timeout=settings.SCHEDULER_DEFAULT_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,57 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class SessionCache:
+    """ログイン済みセッション（storage_state）を認証情報のハッシュ毎にTTL付きLRUで保持"""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # key -> (保存時刻, storage_state)
+        self._entries: OrderedDict = OrderedDict()
+
+    def _key(self, login_id: str, password: str) -> str:
+        """認証情報そのものは保持せず、ハッシュをキーにする"""
+        return hashlib.sha256(f"{login_id}\0{password}".encode("utf-8")).hexdigest()
+
+    def get(self, login_id: str, password: str) -> Optional[dict]:
+        """有効なstorage_stateを取得（期限切れは破棄）"""
+        key = self._key(login_id, password)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        saved_at, state = entry
+        if time.monotonic() - saved_at > self.ttl_seconds:
+            del self._entries[key]
+            logger.debug(f"Session cache expired: {login_id}")
+            return None
+
+        self._entries.move_to_end(key)
+        return state
+
+    def put(self, login_id: str, password: str, state: dict):
+        """storage_stateを保存し、上限超過分を古い順に破棄"""
+        key = self._key(login_id, password)
+        self._entries[key] = (time.monotonic(), state)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, login_id: str, password: str):
+        """セッション切れを検知したエントリを破棄"""
+        self._entries.pop(self._key(login_id, password), None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+session_cache = SessionCache(
+    ttl_seconds=settings.SESSION_CACHE_TTL_SECONDS,
+    max_entries=settings.SESSION_CACHE_MAX_ENTRIES,
+)
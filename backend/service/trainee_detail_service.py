@@ -1,76 +1,123 @@
 # /service/trainee_detail_service.py
 
 import logging
-from playwright.async_api import async_playwright
 from schemas.trainee_detail_schema import TraineeDetailResponse
 from config.settings import settings
-from service.playwright_utils import login_to_webinsource
+from service.browser_manager import browser_manager
+from service.credential_cache import credential_cache
+from service.detail_cache import DetailCache, detail_cache, prefetch_cache
+from service.http_fast_path import http_fast_path
+from service.page_extractor import extract_table_rows
+from service.scheduler import PRIORITY_NORMAL
 
 logger = logging.getLogger(__name__)
 
-async def scrape_trainee_detail_handler(application_id: str, login_id: str, password: str) -> list[TraineeDetailResponse]:
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-        try:
-            await login_to_webinsource(page, login_id, password)
-            return await _scrape_trainee_detail(page, application_id)
-        finally:
-            await browser.close()
+TRAINEE_TABLE_SELECTOR = "table.table-bordered"
+TRAINEE_ROW_SELECTOR = "tbody > tr"
+
+async def scrape_trainee_detail_handler(
+    application_id: str,
+    login_id: str,
+    password: str,
+    refresh: bool = False,
+    priority: int = PRIORITY_NORMAL,
+    cache: DetailCache = detail_cache,
+) -> list[TraineeDetailResponse]:
+    """キャッシュ経由で受講者一覧を取得（refresh=Trueで再取得）
+
+    cacheは取得結果の保存先（事前取得はprefetch_cache）。利用者の取得では事前取得の結果も使う。
+    """
+    key = ("trainee", application_id)
+    if not credential_cache.verify(login_id, password):
+        # ログイン確認済みでない利用者にはキャッシュを返さず、ログインを伴う取得を行う
+        result = await _scrape_trainee_detail_handler(application_id, login_id, password, priority)
+        cache.put(key, result)
+        return result
+
+    async def load() -> list[TraineeDetailResponse]:
+        if cache is not prefetch_cache:
+            if refresh:
+                # 再取得した内容より古い事前取得の結果を後で返さない
+                prefetch_cache.invalidate(key)
+            else:
+                prefetched = prefetch_cache.get(key)
+                if prefetched is not None:
+                    return prefetched
+        return await _scrape_trainee_detail_handler(application_id, login_id, password, priority)
+
+    return await cache.get_or_load(key, load, refresh=refresh)
+
+async def _scrape_trainee_detail_handler(application_id: str, login_id: str, password: str, priority: int) -> list[TraineeDetailResponse]:
+    if settings.HTTP_FAST_PATH_ENABLED:
+        result = await _fetch_trainees_via_http(application_id, login_id, password)
+        if result is not None:
+            return result
+
+    async with browser_manager.get_authenticated_page(
+        login_id, password, url=settings.WEBINSOURCE_TRAINEE_URL, priority=priority
+    ) as page:
+        return await _scrape_trainee_detail(page, application_id)
 
 async def _scrape_trainee_detail(page, application_id: str) -> list[TraineeDetailResponse]:
-    await page.goto(settings.WEBINSOURCE_TRAINEE_URL)
     await page.fill("#TrainingIDText", application_id)
     await page.click("#btnSearch")
-    await page.wait_for_selector("table.table-bordered", timeout=10000)
+    await page.wait_for_selector(TRAINEE_TABLE_SELECTOR, timeout=10000)
 
-    table = await page.query_selector("table.table-bordered")
-    if not table:
+    rows = await extract_table_rows(page, TRAINEE_TABLE_SELECTOR, TRAINEE_ROW_SELECTOR)
+    if rows is None:
         raise Exception("受講者テーブルが見つかりません")
 
-    rows = await table.query_selector_all("tbody > tr")
-    result = []
+    return build_trainees(rows)
+
+async def _fetch_trainees_via_http(application_id: str, login_id: str, password: str):
+    """ログイン済みセッションでHTTP直接取得（取得・変換できなければNone）"""
+    rows = await http_fast_path.fetch_trainees(application_id, login_id, password)
+    if rows is None:
+        return None
+
+    try:
+        return build_trainees(rows)
+    except Exception as e:
+        logger.warning(f"HTTP取得結果の変換に失敗したためブラウザで再取得します: {application_id} - {e}")
+        return None
 
-    def strip_annotation(text: str) -> str:
-        return text.replace("※1", "").replace("※2", "").replace("済", "").strip()
+def strip_annotation(text: str) -> str:
+    return text.replace("※1", "").replace("※2", "").replace("済", "").strip()
+
+def build_trainees(rows: list[list[dict]]) -> list[TraineeDetailResponse]:
+    """受講者テーブル（2行で1名）のセルデータからレスポンスを組み立てる"""
+    result = []
 
-    i = 0
-    while i < len(rows):
-        r1 = rows[i]
-        r2 = rows[i + 1] if i + 1 < len(rows) else None
-        cells_r1 = await r1.query_selector_all("td")
-        cells_r2 = await r2.query_selector_all("td") if r2 else []
+    def get_text(cells, idx):
+        return cells[idx]["text"] if idx < len(cells) else ""
 
-        async def get_text(cells, idx):
-            if idx < len(cells):
-                return (await cells[idx].inner_text()).strip()
-            return ""
+    for i in range(0, len(rows), 2):
+        cells_r1 = rows[i]
+        cells_r2 = rows[i + 1] if i + 1 < len(rows) else []
 
         entry_link, cert_link, product_text = "", "", ""
         if len(cells_r1) >= 6:
             prod_cell = cells_r1[5]
-            links = await prod_cell.query_selector_all("a")
-            for a in links:
-                href = await a.get_attribute("href")
-                text = strip_annotation(await a.inner_text())
+            for a in prod_cell["links"]:
+                href = a["href"]
+                text = strip_annotation(a["text"])
                 if "受講票発行" in text:
                     entry_link = f"https://secure.insource.co.jp{href}"
                 elif "受講証明書" in text:
                     cert_link = f"https://secure.insource.co.jp{href}"
-            product_text = strip_annotation(await prod_cell.inner_text())
+            product_text = strip_annotation(prod_cell["text"])
 
         result.append(TraineeDetailResponse(
-            customer=await get_text(cells_r1, 1),
-            application=await get_text(cells_r1, 2),
-            status=await get_text(cells_r1, 3),
-            trainee=await get_text(cells_r1, 4),
+            customer=get_text(cells_r1, 1),
+            application=get_text(cells_r1, 2),
+            status=get_text(cells_r1, 3),
+            trainee=get_text(cells_r1, 4),
             product=product_text,
             entry_link=entry_link or None,
             cert_link=cert_link or None,
-            payment=await get_text(cells_r1, 6),
-            # control=await get_text(cells_r1, 7),
-            condition=await get_text(cells_r2, 0) if cells_r2 else ""
+            payment=get_text(cells_r1, 6),
+            # control=get_text(cells_r1, 7),
+            condition=get_text(cells_r2, 0) if cells_r2 else ""
         ))
-        i += 2
 
     return result
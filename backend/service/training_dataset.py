@@ -0,0 +1,204 @@
+# service/training_dataset.py
+
+import bisect
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Optional
+from service.call_log_search import ngrams, normalize
+from utils.training_files import get_today_merged_csv_path
+
+logger = logging.getLogger(__name__)
+
+# 研修名・ふりがなの部分一致検索に使うn-gramの長さ
+NAME_NGRAM = 2
+NAME_FIELDS = ('研修名', 'ふりがな')
+_DATE_PATTERN = re.compile(r"(\d{4})[/-](\d{1,2})[/-](\d{1,2})")
+
+def normalize_name(text: str) -> str:
+    """全角/半角・大文字/小文字・ひらがな/カタカナの違いを吸収（画面のフリーワード検索と同じ）"""
+    return "".join(
+        chr(ord(c) + 0x60) if "\u3041" <= c <= "\u3096" else c
+        for c in normalize(text)
+    )
+
+def parse_held_on(value: str) -> Optional[str]:
+    """開催日（YYYY/MM/DD など）をYYYY-MM-DDに。読めなければNone"""
+    match = _DATE_PATTERN.search(value or "")
+    if not match:
+        return None
+    try:
+        return date(*(int(g) for g in match.groups())).isoformat()
+    except ValueError:
+        return None
+
+class TrainingDataset:
+    """当日のマージ済み研修CSVを読み込んだ結果（作成後は変更しない）
+
+    - rows: 受電履歴列を追加した行
+    - json_bytes / gzip_bytes: /training-search/csv の応答本文（リクエスト毎にシリアライズしない）
+    - 検索用のインデックス（Web連携ID・会場名・ROOM・講師のハッシュ、開催日の昇順、研修名/ふりがなのn-gram）
+    """
+
+    def __init__(self, path: Optional[Path], mtime_ns: int, rows: list):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.rows = rows
+        self.json_bytes = json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.gzip_bytes = gzip.compress(self.json_bytes, compresslevel=6, mtime=0)
+        self.etag = f'"{hashlib.sha1(self.json_bytes).hexdigest()}"'
+        self._build_indexes()
+
+    def _build_indexes(self):
+        # 値 -> 行番号の昇順リスト
+        self._by_web_id: dict = {}
+        self._by_venue: dict = {}
+        self._by_room: dict = {}
+        self._by_instructor: dict = {}
+        # (開催日, 行番号) の昇順
+        self._by_held_on: list = []
+        self._name_texts: list = []
+        self._name_postings: dict = {}
+        for i, row in enumerate(self.rows):
+            self._by_web_id.setdefault((row.get('Web連携ID') or '').strip(), []).append(i)
+            self._by_venue.setdefault(normalize_name(row.get('会場名')).strip(), []).append(i)
+            self._by_room.setdefault(normalize_name(row.get('ROOM')).strip(), []).append(i)
+            self._by_instructor.setdefault(normalize_name(row.get('講師')).strip(), []).append(i)
+            held_on = parse_held_on(row.get('開催日'))
+            if held_on is not None:
+                self._by_held_on.append((held_on, i))
+            text = "\n".join(normalize_name(row.get(field)) for field in NAME_FIELDS)
+            self._name_texts.append(text)
+            for gram in ngrams(text, NAME_NGRAM):
+                self._name_postings.setdefault(gram, []).append(i)
+        self._by_held_on.sort()
+
+    def _name_candidates(self, query: str) -> Optional[set]:
+        """n-gramで候補を絞り、研修名/ふりがなに部分一致する行番号"""
+        terms = [term for term in normalize_name(query).split() if term]
+        if not terms:
+            return None
+        candidates = None
+        for term in terms:
+            if len(term) < NAME_NGRAM:
+                # n-gramより短い語は候補内を直接確認する
+                ids = range(len(self.rows)) if candidates is None else candidates
+            else:
+                postings = [self._name_postings.get(gram, []) for gram in ngrams(term, NAME_NGRAM)]
+                ids = set(min(postings, key=len))
+                for posting in postings:
+                    ids.intersection_update(posting)
+                if candidates is not None:
+                    ids &= candidates
+            candidates = {i for i in ids if term in self._name_texts[i]}
+            if not candidates:
+                break
+        return candidates
+
+    def search(
+        self,
+        web_id: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        venue: Optional[str] = None,
+        room: Optional[str] = None,
+        instructor: Optional[str] = None,
+        q: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> tuple[list, int]:
+        """条件に一致する行をCSVの順で返す。戻り値は (offset〜offset+limitの行, 一致した件数)"""
+        if date_from and date_to and date_from > date_to:
+            raise ValueError("date_from は date_to 以前の日付を指定してください")
+
+        candidate_sets = []
+        for index, value in (
+            (self._by_web_id, (web_id or '').strip()),
+            (self._by_venue, normalize_name(venue).strip()),
+            (self._by_room, normalize_name(room).strip()),
+            (self._by_instructor, normalize_name(instructor).strip()),
+        ):
+            if value:
+                candidate_sets.append(index.get(value, ()))
+        if date_from or date_to:
+            low = bisect.bisect_left(self._by_held_on, (date_from.isoformat(),)) if date_from else 0
+            high = bisect.bisect_left(self._by_held_on, (date_to.isoformat() + "\uffff",)) if date_to else len(self._by_held_on)
+            candidate_sets.append([i for _, i in self._by_held_on[low:high]])
+
+        if q is not None:
+            names = self._name_candidates(q)
+            if names is not None:
+                candidate_sets.append(names)
+
+        if candidate_sets:
+            candidate_sets.sort(key=len)
+            matched = set(candidate_sets[0])
+            for ids in candidate_sets[1:]:
+                if not matched:
+                    break
+                matched.intersection_update(ids)
+            matched = sorted(matched)
+        else:
+            matched = range(len(self.rows))
+
+        end = None if limit is None else offset + limit
+        return [self.rows[i] for i in matched[offset:end]], len(matched)
+
+    @property
+    def key(self) -> tuple:
+        return (str(self.path) if self.path else None, self.mtime_ns)
+
+def read_training_rows(file_path: Path) -> list:
+    with open(file_path, encoding="cp932") as f:
+        rows = list(csv.DictReader(f))
+    # 受電履歴列を追加（フロントエンドで使用）
+    for row in rows:
+        row["受電履歴"] = ""  # 空文字列、フロントエンドでボタンとして表示
+    return rows
+
+class TrainingDatasetCache:
+    """研修CSVの読み込み結果を (パス, mtime) 単位で保持する
+
+    新しいマージ済みCSVが出来ると別オブジェクトを作ってから参照を差し替えるので、
+    読み込み中のリクエストは古いデータを最後まで使える。
+    """
+
+    def __init__(self):
+        self._dataset = TrainingDataset(None, 0, [])
+        self._lock = threading.Lock()
+
+    def get(self) -> TrainingDataset:
+        """当日のCSVの最新状態を返す（変わっていなければstatのみ）"""
+        file_path = get_today_merged_csv_path()
+        try:
+            mtime_ns = os.stat(file_path).st_mtime_ns
+        except FileNotFoundError:
+            if self._dataset.path is not None:
+                logger.warning(f"当日のCSVファイルが存在しません: {file_path}")
+                self._dataset = TrainingDataset(None, 0, [])
+            return self._dataset
+
+        key = (str(file_path), mtime_ns)
+        if self._dataset.key == key:
+            return self._dataset
+        with self._lock:
+            # 同時に来たリクエストでは1回だけ読み込む
+            if self._dataset.key != key:
+                try:
+                    rows = read_training_rows(file_path)
+                except Exception as e:
+                    # 書き込み途中などで読めない場合は、同じファイルの前回の内容を返す
+                    logger.error(f"CSV読み込みエラー: {e}")
+                    return self._dataset if self._dataset.path == file_path else TrainingDataset(None, 0, [])
+                self._dataset = TrainingDataset(file_path, mtime_ns, rows)
+                logger.info(f"CSV data loaded: {len(rows)} records from {file_path.name}")
+            return self._dataset
+
+training_dataset_cache = TrainingDatasetCache()
@@ -1,78 +1,281 @@
+import asyncio
 import logging
-from playwright.async_api import async_playwright
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Optional
 from config.settings import settings
-from service.playwright_utils import login_to_webinsource
-from schemas.training_detail_schema import DetailResponse, Attendee
+from service.browser_manager import browser_manager
+from service.credential_cache import credential_cache
+from service.detail_cache import DetailCache, detail_cache, get_cached, prefetch_cache
+from service.http_fast_path import http_fast_path
+from service.page_extractor import extract_key_value_rows, extract_table_rows, is_session_expired
+from service.scheduler import PRIORITY_NORMAL
+from schemas.training_detail_schema import BatchDetailItem, DetailResponse, Attendee
 
 logger = logging.getLogger(__name__)
 
-async def scrape_detail_page(web_id: str, login_id: str, password: str) -> dict:
-    url = f"{settings.WEBINSOURCE_MANAGE_URL}/{web_id}"
+BASIC_INFO_ROW_SELECTOR = "table.table-bordered:nth-of-type(1) tr"
+ATTENDEE_TABLE_SELECTOR = "table#plan"
+ATTENDEE_ROW_SELECTOR = "tbody tr"
 
-    try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context()
-            page = await context.new_page()
+async def scrape_detail_page(web_id: str, login_id: str, password: str, refresh: bool = False) -> DetailResponse:
+    """キャッシュ経由で研修詳細を取得（refresh=Trueで再取得）"""
+    key = ("detail", web_id)
+    if not credential_cache.verify(login_id, password):
+        # ログイン確認済みでない利用者にはキャッシュを返さず、ログインを伴う取得を行う
+        result = await _scrape_detail_page(web_id, login_id, password)
+        detail_cache.put(key, result)
+        return result
 
-            success = await login_to_webinsource(page, login_id, password)
-            if not success:
-                raise ValueError("ログイン失敗")
+    async def load() -> DetailResponse:
+        if refresh:
+            # 再取得した内容より古い事前取得の結果を後で返さない
+            prefetch_cache.invalidate(key)
+        else:
+            prefetched = prefetch_cache.get(key)
+            if prefetched is not None:
+                return prefetched
+        return await _scrape_detail_page(web_id, login_id, password)
 
-            await page.goto(url, wait_until="load", timeout=30000)
-            logger.info(f"詳細ページアクセス成功: {web_id}")
+    return await detail_cache.get_or_load(key, load, refresh=refresh)
+
+async def _scrape_detail_page(web_id: str, login_id: str, password: str) -> DetailResponse:
+    if settings.HTTP_FAST_PATH_ENABLED:
+        result = await _fetch_detail_via_http(web_id, login_id, password)
+        if result is not None:
+            return result
+
+    url = _detail_url(web_id)
 
-            # 基本情報の取得
-            detail_data = {}
-            rows = await page.query_selector_all("table.table-bordered:nth-of-type(1) tr")
-            for row in rows:
-                th = await row.query_selector("th")
-                td = await row.query_selector("td")
-                if th and td:
-                    key = (await th.inner_text()).strip()
-                    value = (await td.inner_text()).strip()
-                    detail_data[key] = value
-
-            # 受講者一覧の取得
-            attendee_data = []
-            table = await page.query_selector("table#plan")
-            if table:
-                trs = await table.query_selector_all("tbody tr")
-                for i in range(0, len(trs), 2):
-                    row1, row2 = trs[i], trs[i + 1] if i + 1 < len(trs) else None
-                    tds1 = await row1.query_selector_all("td")
-                    tds2 = await row2.query_selector_all("td") if row2 else []
-                    attendee = {}
-
-                    async def text(el): return (await el.inner_text()).strip() if el else ""
-
-                    if len(tds1) >= 12:
-                        attendee["申込No"] = await text(tds1[1])
-                        img = await tds1[2].query_selector("img")
-                        src = await img.get_attribute("src") if img else ""
-                        attendee["申込方法"] = src.split("/")[-1] if src else ""
-                        attendee["取引ID"] = await text(tds1[3])
-                        attendee["決済種別"] = await text(tds1[4])
-                        attendee["受講状況"] = await text(tds1[5])
-                        attendee["お客様名"] = await text(tds1[6])
-                        attendee["部署名"] = await text(tds1[7])
-                        attendee["役職"] = await text(tds1[8])
-                        attendee["氏名"] = await text(tds1[9])
-                        attendee["受講票最終発行日"] = await text(tds1[10])
-                        attendee["ご質問とご要望"] = await text(tds1[11])
-
-                    if len(tds2) >= 1:
-                        attendee["申込日時"] = await text(tds2[0])
-                    if len(tds2) >= 3:
-                        attendee["カナ"] = await text(tds2[-1])
-
-                    attendee_data.append(attendee)
-
-            return DetailResponse(
-                基本情報=detail_data,
-                受講者一覧=[Attendee(**a) for a in attendee_data]
-            )
+    try:
+        async with browser_manager.get_authenticated_page(login_id, password, url=url) as page:
+            logger.info(f"詳細ページアクセス成功: {web_id}")
+            return await _extract_detail(page)
 
     except Exception as e:
         logger.error(f"詳細ページ取得エラー: {e}")
         raise
+
+def _detail_url(web_id: str) -> str:
+    return f"{settings.WEBINSOURCE_MANAGE_URL}/{web_id}"
+
+async def _extract_detail(page) -> DetailResponse:
+    # 基本情報の取得
+    detail_data = await extract_key_value_rows(page, BASIC_INFO_ROW_SELECTOR)
+
+    # 受講者一覧の取得
+    rows = await extract_table_rows(page, ATTENDEE_TABLE_SELECTOR, ATTENDEE_ROW_SELECTOR)
+
+    return DetailResponse(
+        基本情報=detail_data,
+        受講者一覧=build_attendees(rows or [])
+    )
+
+class _BatchBrowser:
+    """バッチ内で共有する1つのログイン済みコンテキスト（ブラウザが必要になった時点で開く）
+
+    途中でセッションが切れた場合は1回だけ再ログインする。
+    開けなかった（ログインに失敗した）場合はその例外を覚えておき、以降の取得も同じ例外で失敗させる。
+    """
+
+    def __init__(self, login_id: str, password: str, first_url: str, priority: int):
+        self.login_id = login_id
+        self.password = password
+        self.first_url = first_url
+        self.priority = priority
+        self._stack = AsyncExitStack()
+        self._lock = asyncio.Lock()
+        self._context = None
+        self._open_error: Optional[BaseException] = None
+        self._idle_pages = []
+        # ログインする度に進める（同時にセッション切れを検知したページが重ねて再ログインしないように）
+        self.generation = 0
+        self.relogins = 0
+        self._login_lock = asyncio.Lock()
+
+    async def open(self):
+        async with self._lock:
+            if self._open_error is not None:
+                raise self._open_error
+            if self._context is None:
+                try:
+                    page = await self._stack.enter_async_context(
+                        browser_manager.get_authenticated_page(
+                            self.login_id, self.password, url=self.first_url, priority=self.priority, batch=True
+                        )
+                    )
+                except Exception as e:
+                    self._open_error = e
+                    raise
+                self._context = page.context
+                self._idle_pages.append(page)
+
+    @asynccontextmanager
+    async def page(self):
+        await self.open()
+        page = self._idle_pages.pop() if self._idle_pages else await self._context.new_page()
+        try:
+            yield page
+        finally:
+            self._idle_pages.append(page)
+
+    async def goto(self, page, url: str):
+        """urlへ移動（ログイン画面へ戻された場合は再ログインしてもう一度）"""
+        generation = self.generation
+        await page.goto(url, wait_until="load", timeout=30000)
+        if await is_session_expired(page):
+            await self._relogin(generation)
+            await page.goto(url, wait_until="load", timeout=30000)
+            if await is_session_expired(page):
+                raise RuntimeError("セッション切れのため詳細ページを開けません")
+
+    async def _relogin(self, generation: int):
+        """generationはセッション切れを検知したページが使っていたログイン"""
+        async with self._login_lock:
+            if self.generation != generation:
+                # 他のページが再ログイン済み
+                return
+            if self._open_error is not None:
+                raise self._open_error
+            if self.relogins >= 1:
+                raise RuntimeError("再ログイン後もセッションが切れました")
+            self.relogins += 1
+            logger.info(f"Batch session expired, re-login: {self.login_id}")
+            page = await self._context.new_page()
+            try:
+                await browser_manager.relogin(page, self.login_id, self.password)
+            except Exception as e:
+                self._open_error = e
+                raise
+            finally:
+                await page.close()
+            self.generation += 1
+
+    async def close(self):
+        await self._stack.aclose()
+
+async def scrape_detail_batch(
+    web_ids: list[str],
+    login_id: str,
+    password: str,
+    refresh: bool = False,
+    concurrency: Optional[int] = None,
+    priority: int = PRIORITY_NORMAL,
+    cache: DetailCache = detail_cache,
+) -> AsyncIterator[BatchDetailItem]:
+    """複数の研修詳細を1回のログイン・1つのコンテキストで取得し、完了した順に返すイテレータを作成
+
+    ログイン確認済みでない場合はここでログインし、失敗すればValueErrorを送出する。
+    cacheは取得結果の保存先（事前取得はprefetch_cache）。
+    """
+    ids = list(dict.fromkeys(web_ids))
+    authenticated = credential_cache.verify(login_id, password)
+    batch = _BatchBrowser(login_id, password, _detail_url(ids[0]) if ids else settings.WEBINSOURCE_TOP_URL, priority)
+    if not authenticated:
+        try:
+            await batch.open()
+        except Exception:
+            await batch.close()
+            raise
+
+    return _stream_detail_batch(ids, login_id, password, refresh, batch, concurrency or settings.DETAIL_BATCH_CONCURRENCY, cache)
+
+async def _stream_detail_batch(
+    ids: list[str],
+    login_id: str,
+    password: str,
+    refresh: bool,
+    batch: _BatchBrowser,
+    concurrency: int,
+    cache: DetailCache,
+) -> AsyncIterator[BatchDetailItem]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def load(web_id: str) -> DetailResponse:
+        if settings.HTTP_FAST_PATH_ENABLED:
+            result = await _fetch_detail_via_http(web_id, login_id, password)
+            if result is not None:
+                return result
+
+        url = _detail_url(web_id)
+        async with semaphore:
+            async with batch.page() as page:
+                if page.url != url:
+                    await batch.goto(page, url)
+                return await _extract_detail(page)
+
+    async def run(web_id: str) -> BatchDetailItem:
+        try:
+            key = ("detail", web_id)
+            if refresh and cache is not prefetch_cache:
+                prefetch_cache.invalidate(key)
+            data = await cache.get_or_load(key, lambda: load(web_id), refresh=True)
+            return BatchDetailItem(web_id=web_id, success=True, data=data)
+        except Exception as e:
+            logger.warning(f"一括詳細取得エラー: web_id={web_id} - {e}")
+            return BatchDetailItem(web_id=web_id, success=False, error=str(e))
+
+    try:
+        pending = []
+        for web_id in ids:
+            key = ("detail", web_id)
+            cached = None if refresh else (cache.get(key) if cache is prefetch_cache else get_cached(key))
+            if cached is not None:
+                yield BatchDetailItem(web_id=web_id, success=True, data=cached)
+            else:
+                pending.append(web_id)
+
+        tasks = [asyncio.create_task(run(web_id)) for web_id in pending]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            # 取得中のページを閉じる前に、中断した取得が終わるのを待つ
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await batch.close()
+
+async def _fetch_detail_via_http(web_id: str, login_id: str, password: str):
+    """ログイン済みセッションでHTTP直接取得（取得・変換できなければNone）"""
+    tables = await http_fast_path.fetch_detail(web_id, login_id, password)
+    if tables is None:
+        return None
+
+    detail_data, rows = tables
+    try:
+        return DetailResponse(基本情報=detail_data, 受講者一覧=build_attendees(rows))
+    except Exception as e:
+        logger.warning(f"HTTP取得結果の変換に失敗したためブラウザで再取得します: {web_id} - {e}")
+        return None
+
+def build_attendees(rows: list[list[dict]]) -> list[Attendee]:
+    """受講者一覧（2行で1名）のセルデータからAttendeeを組み立てる"""
+    attendee_data = []
+    for i in range(0, len(rows), 2):
+        tds1 = rows[i]
+        tds2 = rows[i + 1] if i + 1 < len(rows) else []
+        attendee = {}
+
+        if len(tds1) >= 12:
+            attendee["申込No"] = tds1[1]["text"]
+            src = tds1[2]["img"]
+            attendee["申込方法"] = src.split("/")[-1] if src else ""
+            attendee["取引ID"] = tds1[3]["text"]
+            attendee["決済種別"] = tds1[4]["text"]
+            attendee["受講状況"] = tds1[5]["text"]
+            attendee["お客様名"] = tds1[6]["text"]
+            attendee["部署名"] = tds1[7]["text"]
+            attendee["役職"] = tds1[8]["text"]
+            attendee["氏名"] = tds1[9]["text"]
+            attendee["受講票最終発行日"] = tds1[10]["text"]
+            attendee["ご質問とご要望"] = tds1[11]["text"]
+
+        if len(tds2) >= 1:
+            attendee["申込日時"] = tds2[0]["text"]
+        if len(tds2) >= 3:
+            attendee["カナ"] = tds2[-1]["text"]
+
+        attendee_data.append(attendee)
+
+    return [Attendee(**a) for a in attendee_data]
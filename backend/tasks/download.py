@@ -1,15 +1,37 @@
 import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta, date
+from typing import Optional
 import jpholiday
 import pandas as pd
 from playwright.async_api import async_playwright
+from service.page_extractor import is_session_expired
 from service.playwright_utils import login_to_webinsource
 from config.settings import settings
+from utils.training_files import merged_csv_name
 
 CATEGORY_VALUES = ["1", "2"]
 DATA_DIR = Path(__file__).resolve().parent.parent / "downloads"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
+# 差分更新モード（DOWNLOAD_INCREMENTAL）で保持する日付毎のCSVと、そのハッシュ・取得時刻
+DAILY_DIR = DATA_DIR / "daily"
+STATE_FILE = DATA_DIR / "download_state.json"
+# 直近のマージで増減したWeb連携ID
+CHANGES_FILE = DATA_DIR / "download_changes.json"
+
+# 公開講座一覧（koukaikouza_*.xlsx）から付与する列
+KOUKAIKOUZA_COLUMNS = ["工程表ID", "講師", "ふりがな", "MeetingID", "Meetingパスワード"]
+# (xlsxのパス, mtime_ns) -> Web連携IDをインデックスにした付与用の表（プロセス毎）
+_koukaikouza_tables: dict = {}
+# .pkl の形式を変えたら上げる（古い形式のキャッシュは作り直す）
+KOUKAIKOUZA_CACHE_VERSION = 2
 
 KEEP_COLUMNS = ["No", "開催日", "時間", "研修名", "会場名", "ROOM", "Web連携ID",
                 "工程表ID", "講師", "ふりがな", "ZoomID", "ZoomPW"]
@@ -32,6 +54,15 @@ def fmt_date(d: date) -> str:
 def is_business_day(d: date) -> bool:
     return d.weekday() < 5 and not jpholiday.is_holiday(d)
 
+def web_id_key(values):
+    """Web連携IDを結合用の数値に揃える（ExcelとCSVで数値/文字列の読み込みが違っても一致させる。読めない値はNaN）"""
+    return pd.to_numeric(values, errors="coerce").astype("float64")
+
+def web_id_strings(values) -> set[str]:
+    """Web連携IDを "123456" 形式の文字列に揃える（web_id_keyと同じ規則。読めない値は除く）"""
+    keys = web_id_key(pd.Series(values)).dropna()
+    return {str(int(key)) if key.is_integer() else str(key) for key in keys}
+
 def normalize_room(x):
     try:
         f = float(x)
@@ -83,8 +114,10 @@ def normalize_room(x):
 #        await browser.close()
 
 
-async def set_filters(page, target_date: datetime):
+async def set_filters(page, target_date: datetime, date_to: Optional[datetime] = None):
+    """開催日をtarget_date（date_to指定時はtarget_date〜date_to）に設定"""
     date_str = fmt_date(target_date)
+    date_to_str = fmt_date(date_to or target_date)
     await page.wait_for_selector("#open_training_app_cd", state="attached", timeout=10000)
     await page.evaluate(f"""
         const el = document.querySelector("#open_training_app_cd");
@@ -94,89 +127,268 @@ async def set_filters(page, target_date: datetime):
         }});
     """)
     await page.fill("#date_from_calender", date_str)
-    await page.fill("#date_to_calender", date_str)
-    print(f"{date_str} 開催日を設定")
-
-async def download_webinsource_for_date(p, target_date: datetime, login_id: str, password: str):
-    date_str = fmt_date(target_date)
-    browser = await p.chromium.launch(headless=True)
-    context = await browser.new_context(accept_downloads=True)
-    page = await context.new_page()
-
-    try:
-        await login_to_webinsource(page, login_id, password)
-        print(f"{date_str} ログイン成功")
+    await page.fill("#date_to_calender", date_to_str)
+    print(f"{date_str}{'〜' + date_to_str if date_to_str != date_str else ''} 開催日を設定")
+
+class DownloadSession:
+    """1回のダウンロードジョブで共有するブラウザコンテキスト
+
+    ログインは最初の1回だけで、日付毎のページは同じコンテキストのCookieを使う。
+    途中でセッションが切れた場合は1回だけ再ログインする。
+    """
+
+    def __init__(self, context, login_id: str, password: str, executor: Optional[Executor] = None):
+        self.context = context
+        self.login_id = login_id
+        self.password = password
+        # CSVの整形など重いpandas処理の実行先（未指定ならスレッド）
+        self.executor = executor
+        # ログインする度に進める（同時にセッション切れを検知したページが重ねて再ログインしないように）
+        self.generation = 0
+        self.relogins = 0
+        self._login_lock = asyncio.Lock()
+
+    async def login(self):
+        page = await self.context.new_page()
+        try:
+            if not await login_to_webinsource(page, self.login_id, self.password):
+                raise RuntimeError("WebInsourceへのログインに失敗しました")
+        finally:
+            await page.close()
+        self.generation += 1
+        print("ログイン成功")
+
+    async def relogin(self, generation: int):
+        """generationはセッション切れを検知したページが使っていたログイン"""
+        async with self._login_lock:
+            if self.generation != generation:
+                # 他のページが再ログイン済み
+                return
+            if self.relogins >= 1:
+                raise RuntimeError("再ログイン後もセッションが切れました")
+            self.relogins += 1
+            print("セッション切れを検知したため再ログイン")
+            await self.login()
+
+    async def run_cpu_bound(self, func, *args):
+        """イベントループを止めないよう、別プロセス（またはスレッド）で実行"""
+        if self.executor is None:
+            return await asyncio.to_thread(func, *args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def open_kenshu_page(self, page):
+        """研修管理ページを開く（セッション切れなら再ログインしてもう一度）"""
+        generation = self.generation
         await page.goto(settings.WEBINSOURCE_KENSHU_URL)
-        print(f"{date_str} 研修管理ページへ遷移")
-
-        await set_filters(page, target_date)
-        await page.click("#btnSearch", timeout=180000)
-        await page.wait_for_selector("ul.pagination", timeout=180000)
-        print(f"{date_str} 検索結果読み込み完了")
-
-        async with page.expect_download() as download_info:
-            await page.click("#btnCsv", timeout=180000, no_wait_after=True)
-        download = await download_info.value
-
-        filename = target_date.strftime("%y%m%d") + "_webinsource.csv"
-        file_path = DATA_DIR / filename
-        await download.save_as(str(file_path))
-        print(f"{date_str} CSVダウンロード完了")
-
-        df = pd.read_csv(file_path, encoding="cp932")
-
-        if "開催日" in df.columns:
-            df["開催日"] = date_str
-
-        if "会場名" in df.columns:
-            df["会場名"] = df["会場名"].replace(VENUE_REPLACE_MAP)
-            df["会場名"] = df["会場名"].str.replace(
-                r"【東京】インソース(.+?)セミナールーム", r"\1", regex=True
-            )
-
-        if "ROOM" in df.columns and "会議室名" in df.columns:
-            df["ROOM"] = df["ROOM"].fillna(df["会議室名"])
-            df.drop(columns=["会議室名"], inplace=True)
-
-        if "ROOM" in df.columns:
-            df["ROOM"] = df["ROOM"].apply(normalize_room)
+        if await is_session_expired(page):
+            await self.relogin(generation)
+            await page.goto(settings.WEBINSOURCE_KENSHU_URL)
+            if await is_session_expired(page):
+                raise RuntimeError("研修管理ページを開けません（セッション切れ）")
+
+def _build_koukaikouza_table(xlsx_path: Path) -> Optional[pd.DataFrame]:
+    koukaikouza_df = pd.read_excel(xlsx_path)
+    koukaikouza_df.columns = koukaikouza_df.columns.str.replace("\n", "", regex=False)
+    if "Web連携ID" not in koukaikouza_df.columns:
+        return None
+
+    koukaikouza_df = koukaikouza_df.assign(Web連携ID=web_id_key(koukaikouza_df["Web連携ID"]))
+    koukaikouza_df = koukaikouza_df.dropna(subset=["Web連携ID"]).drop_duplicates("Web連携ID")
+    table = koukaikouza_df.set_index("Web連携ID")[[col for col in KOUKAIKOUZA_COLUMNS if col in koukaikouza_df.columns]]
+    if "Meetingパスワード" in table.columns and pd.api.types.is_string_dtype(table["Meetingパスワード"]):
+        table = table.assign(Meetingパスワード=table["Meetingパスワード"].str.replace("\n", " ", regex=False))
+    return table
+
+def load_koukaikouza_table() -> Optional[pd.DataFrame]:
+    """最新の koukaikouza_*.xlsx をWeb連携IDで引ける表にする
+
+    Excelの読み込みは遅いので、xlsxの更新時刻毎に1回だけ読み、結果を同じ名前の .pkl に保存して
+    以降（別プロセス・次回のジョブ）はそれを読む。xlsxが無ければNone。
+    """
+    koukaikouza_files = sorted(DATA_DIR.glob("koukaikouza_*.xlsx"))
+    if not koukaikouza_files:
+        return None
+    xlsx_path = koukaikouza_files[-1]
+    key = (str(xlsx_path), xlsx_path.stat().st_mtime_ns)
+    if key in _koukaikouza_tables:
+        return _koukaikouza_tables[key]
+
+    sidecar = xlsx_path.with_suffix(".pkl")
+    cached = None
+    try:
+        with open(sidecar, "rb") as f:
+            cached = pickle.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"[公開講座キャッシュ読み込み失敗] {sidecar.name}: {e}")
+
+    if cached is not None and cached.get("mtime_ns") == key[1] and cached.get("version") == KOUKAIKOUZA_CACHE_VERSION:
+        table = cached["table"]
+    else:
+        table = _build_koukaikouza_table(xlsx_path)
+        temp_file = sidecar.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_file, "wb") as f:
+            pickle.dump({"mtime_ns": key[1], "version": KOUKAIKOUZA_CACHE_VERSION, "table": table}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        temp_file.replace(sidecar)
+        print(f"公開講座一覧を読み込みました: {xlsx_path.name}（{0 if table is None else len(table)}件）")
+
+    _koukaikouza_tables.clear()
+    _koukaikouza_tables[key] = table
+    return table
+
+def enrich_webinsource_df(df: pd.DataFrame, date_str: Optional[str] = None) -> pd.DataFrame:
+    """会場名・ROOMの整形と公開講座一覧（koukaikouza_*.xlsx）からの講師・Zoom情報の付与
+
+    date_strを指定すると開催日をその日付で揃える（期間検索では行毎に正規化済みの開催日を使う）。
+    """
+    if date_str is not None and "開催日" in df.columns:
+        df["開催日"] = date_str
+
+    if "会場名" in df.columns:
+        df["会場名"] = df["会場名"].replace(VENUE_REPLACE_MAP)
+        df["会場名"] = df["会場名"].str.replace(
+            r"【東京】インソース(.+?)セミナールーム", r"\1", regex=True
+        )
+
+    if "ROOM" in df.columns and "会議室名" in df.columns:
+        df["ROOM"] = df["ROOM"].fillna(df["会議室名"])
+        df.drop(columns=["会議室名"], inplace=True)
+
+    if "ROOM" in df.columns:
+        df["ROOM"] = df["ROOM"].apply(normalize_room)
+
+    # 公開講座一覧の列をWeb連携IDで1回の結合で付与（一覧に無いIDは空）
+    table = load_koukaikouza_table()
+    if table is not None and "Web連携ID" in df.columns:
+        df = df.drop(columns=[col for col in table.columns if col in df.columns])
+        matched = table.reindex(web_id_key(df["Web連携ID"]))
+        matched.index = df.index
+        df = df.join(matched)
+
+    df.rename(columns={
+        "MeetingID": "ZoomID",
+        "Meetingパスワード": "ZoomPW"
+    }, inplace=True)
+    return df
+
+def format_webinsource_csv(file_path: Path, date_str: str):
+    df = pd.read_csv(file_path, encoding="cp932")
+    enrich_webinsource_df(df, date_str).to_csv(file_path, index=False, encoding="cp932")
+
+def split_range_csv(file_path: Path, target_dates: list[datetime]) -> Optional[int]:
+    """期間検索のCSVを開催日毎の *_webinsource.csv に分けて整形する
+
+    件数が上限に達している（結果が打ち切られている可能性がある）場合や、開催日を読めない行がある場合は
+    何も書かずにNoneを返す（日付毎の検索に切り替える）。戻り値は書き出した件数。
+    """
+    df = pd.read_csv(file_path, encoding="cp932")
+    if len(df) >= settings.DOWNLOAD_RANGE_MAX_ROWS:
+        print(f"期間検索の結果が上限（{settings.DOWNLOAD_RANGE_MAX_ROWS}件）に達しました: {len(df)}件")
+        return None
+    if "開催日" not in df.columns:
+        print("期間検索のCSVに開催日列がありません")
+        return None
+
+    parts = df["開催日"].astype(str).str.extract(r"(\d{4})[/-](\d{1,2})[/-](\d{1,2})")
+    if parts.isna().any(axis=None):
+        print(f"期間検索のCSVに開催日を読めない行があります: {int(parts.isna().any(axis=1).sum())}件")
+        return None
+    df["開催日"] = parts[0] + "/" + parts[1].str.zfill(2) + "/" + parts[2].str.zfill(2)
+    df = enrich_webinsource_df(df)
+
+    count = 0
+    for target_date in target_dates:
+        # 日付毎の検索と同じく、営業日以外の開催分は含めない
+        day_df = df[df["開催日"] == fmt_date(target_date)]
+        day_df.to_csv(DATA_DIR / (target_date.strftime("%y%m%d") + "_webinsource.csv"), index=False, encoding="cp932")
+        count += len(day_df)
+    return count
+
+async def search_and_download(session: DownloadSession, page, file_path: Path, timings: dict, date_from: datetime, date_to: Optional[datetime] = None):
+    """研修管理ページで開催日を指定して検索し、結果のCSVをfile_pathに保存"""
+    label = timings["date"]
+    step = time.monotonic()
+    await session.open_kenshu_page(page)
+    print(f"{label} 研修管理ページへ遷移")
+
+    await set_filters(page, date_from, date_to)
+    await page.click("#btnSearch", timeout=180000)
+    await page.wait_for_selector("ul.pagination", timeout=180000)
+    timings["search"] = round(time.monotonic() - step, 2)
+    print(f"{label} 検索結果読み込み完了")
+
+    step = time.monotonic()
+    async with page.expect_download() as download_info:
+        await page.click("#btnCsv", timeout=180000, no_wait_after=True)
+    download = await download_info.value
+    await download.save_as(str(file_path))
+    timings["download"] = round(time.monotonic() - step, 2)
+    print(f"{label} CSVダウンロード完了")
+
+async def download_webinsource_for_range(session: DownloadSession, target_dates: list[datetime]) -> Optional[dict]:
+    """全日程を1回の期間検索でダウンロードし、開催日毎に分けて整形。使えない場合はNone（日付毎の検索に切り替える）"""
+    first, last = target_dates[0], target_dates[-1]
+    timings = {"date": f"{fmt_date(first)}〜{fmt_date(last)}", "status": "ok"}
+    started = time.monotonic()
+    file_path = DATA_DIR / f"{first.strftime('%y%m%d')}-{last.strftime('%y%m%d')}_webinsource_range.csv"
+    page = await session.context.new_page()
 
-        # --- 安定版 map処理（dict変換経由） ---
-        koukaikouza_files = sorted(DATA_DIR.glob("koukaikouza_*.xlsx"))
-        if koukaikouza_files:
-            koukaikouza_df = pd.read_excel(koukaikouza_files[-1])
-            koukaikouza_df.columns = koukaikouza_df.columns.str.replace("\n", "", regex=False)
+    try:
+        await search_and_download(session, page, file_path, timings, first, last)
 
-            if "Web連携ID" in koukaikouza_df.columns:
-                koukaikouza_df = koukaikouza_df.dropna(subset=["Web連携ID"]).drop_duplicates("Web連携ID")
+        step = time.monotonic()
+        count = await session.run_cpu_bound(split_range_csv, file_path, target_dates)
+        if count is None:
+            return None
+        timings["format"] = round(time.monotonic() - step, 2)
+        print(f"{timings['date']} CSV分割・整形・保存完了: {count}件")
+        return timings
 
-                for col in ["工程表ID", "講師", "ふりがな", "MeetingID", "Meetingパスワード"]:
-                    if col in koukaikouza_df.columns:
-                        mapping_dict = koukaikouza_df.set_index("Web連携ID")[col].to_dict()
-                        df[col] = df["Web連携ID"].map(mapping_dict)
+    except Exception as e:
+        print(f"[{timings['date']}] 期間検索エラー: {e}")
+        return None
+    finally:
+        await page.close()
+        file_path.unlink(missing_ok=True)
+        timings["total"] = round(time.monotonic() - started, 2)
 
-                if "Meetingパスワード" in df.columns:
-                    df["Meetingパスワード"] = df["Meetingパスワード"].str.replace("\n", " ", regex=False)
+async def download_webinsource_for_date(session: DownloadSession, target_date: datetime) -> dict:
+    """1日分の検索・CSVダウンロード・整形。戻り値は工程毎の所要秒数"""
+    date_str = fmt_date(target_date)
+    timings = {"date": date_str, "status": "ok"}
+    started = time.monotonic()
+    page = await session.context.new_page()
 
-        df.rename(columns={
-            "MeetingID": "ZoomID",
-            "Meetingパスワード": "ZoomPW"
-        }, inplace=True)
+    try:
+        file_path = DATA_DIR / (target_date.strftime("%y%m%d") + "_webinsource.csv")
+        await search_and_download(session, page, file_path, timings, target_date)
 
-        df.to_csv(file_path, index=False, encoding="cp932")
+        # 整形中も他の日付のページを進められるようにイベントループ外で実行
+        step = time.monotonic()
+        await session.run_cpu_bound(format_webinsource_csv, file_path, date_str)
+        timings["format"] = round(time.monotonic() - step, 2)
         print(f"{date_str} CSV整形・保存完了")
 
     except Exception as e:
+        timings["status"] = "error"
         print(f"[{date_str}] エラー: {e}")
     finally:
-        await context.close()
-        await browser.close()
+        await page.close()
+        timings["total"] = round(time.monotonic() - started, 2)
+    return timings
+
+def merge_csv_and_renumber(files: Optional[list[Path]] = None) -> pd.DataFrame:
+    """日付毎のCSVを当日のマージ済みCSVにまとめてNoを振り直す
 
-def merge_csv_and_renumber():
-    today_str = datetime.today().strftime("%y%m%d")
-    output_file = DATA_DIR / f"{today_str}_webinsource_merged.csv"
+    filesを省略するとDATA_DIRの *_webinsource.csv をマージして削除する。
+    指定した場合（差分更新モード）は元のファイルを残す。
+    """
+    output_file = DATA_DIR / merged_csv_name()
 
-    files = sorted(DATA_DIR.glob("*_webinsource.csv"))
+    keep_sources = files is not None
+    if files is None:
+        files = sorted(DATA_DIR.glob("*_webinsource.csv"))
     merged = pd.DataFrame()
     for file in files:
         df = pd.read_csv(file, encoding="cp932")
@@ -186,19 +398,169 @@ def merge_csv_and_renumber():
     if "No" in merged.columns:
         merged["No"] = range(1, len(merged) + 1)
 
-    merged.to_csv(output_file, index=False, encoding="cp932")
+    # APIが書き込み途中のファイルを読まないよう一時ファイル経由で置き換える
+    temp_file = output_file.with_suffix(".tmp")
+    merged.to_csv(temp_file, index=False, encoding="cp932")
+    temp_file.replace(output_file)
     print(f"CSVマージ完了: {output_file.name}")
 
-    for file in files:
-        if file.name != output_file.name:
-            try:
-                file.unlink()
-            except Exception as e:
-                print(f"[削除失敗] {file.name}: {e}")
+    if not keep_sources:
+        for file in files:
+            if file.name != output_file.name:
+                try:
+                    file.unlink()
+                except Exception as e:
+                    print(f"[削除失敗] {file.name}: {e}")
+    return merged
+
+def daily_filename(target_date: datetime) -> str:
+    return target_date.strftime("%y%m%d") + "_webinsource.csv"
+
+def load_download_state() -> dict:
+    try:
+        with open(STATE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"[状態ファイル読み込み失敗] {e}")
+    return {"dates": {}, "merged": {}}
+
+def save_download_state(state: dict):
+    temp_file = STATE_FILE.with_suffix(".tmp")
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    temp_file.replace(STATE_FILE)
+
+def freshness_window(target_date: datetime, today: date) -> timedelta:
+    """取得し直すまでの間隔。近い日付ほど短い（当日はDOWNLOAD_FRESHNESS_MINUTES、1日先毎に同じだけ延ばす）"""
+    days = max((target_date.date() - today).days, 0)
+    minutes = min(settings.DOWNLOAD_FRESHNESS_MINUTES * (days + 1), settings.DOWNLOAD_FRESHNESS_MAX_MINUTES)
+    return timedelta(minutes=minutes)
+
+def stale_dates(target_dates: list[datetime], state: dict, now: datetime) -> list[datetime]:
+    """未取得か、前回の取得から取得し直す間隔を過ぎた日付"""
+    stale = []
+    for target_date in target_dates:
+        key = daily_filename(target_date)
+        entry = state["dates"].get(key)
+        if (
+            entry is None
+            or not (DAILY_DIR / key).exists()
+            or now - datetime.fromisoformat(entry["fetched_at"]) >= freshness_window(target_date, now.date())
+        ):
+            stale.append(target_date)
+    return stale
+
+def file_hash(file_path: Path) -> str:
+    return hashlib.sha256(file_path.read_bytes()).hexdigest()
+
+def refresh_incremental(target_dates: list[datetime], fetched_dates: list[datetime], timings: list[dict], state: dict) -> Optional[dict]:
+    """取得した日付のCSVを差し替え、いずれかの日付の内容が変わった場合だけマージし直す
+
+    マージした場合は増減したWeb連携IDを CHANGES_FILE に書き出して返す。変更が無ければNone。
+    """
+    DAILY_DIR.mkdir(exist_ok=True)
+    now = datetime.now().isoformat(timespec="seconds")
+    failed = {t["date"] for t in timings if t["status"] != "ok"}
+
+    changed_dates = []
+    for target_date in fetched_dates:
+        key = daily_filename(target_date)
+        downloaded = DATA_DIR / key
+        if fmt_date(target_date) in failed or not downloaded.exists():
+            # 失敗した日付は前回のCSVを使い、次回もう一度取得する
+            downloaded.unlink(missing_ok=True)
+            continue
+        digest = file_hash(downloaded)
+        downloaded.replace(DAILY_DIR / key)
+        previous = state["dates"].get(key)
+        if previous is None or previous["hash"] != digest:
+            changed_dates.append(fmt_date(target_date))
+        state["dates"][key] = {"date": fmt_date(target_date), "hash": digest, "fetched_at": now}
+
+    # 対象期間から外れた（過ぎた）日付を削除
+    keys = [daily_filename(d) for d in target_dates]
+    for key in set(state["dates"]) - set(keys):
+        (DAILY_DIR / key).unlink(missing_ok=True)
+        del state["dates"][key]
+
+    keys = [key for key in keys if key in state["dates"]]
+    hashes = {key: state["dates"][key]["hash"] for key in keys}
+    output_name = merged_csv_name()
+    previous_merge = state.get("merged") or {}
+    if previous_merge.get("file") == output_name and (DATA_DIR / output_name).exists() and previous_merge.get("hashes") == hashes:
+        save_download_state(state)
+        print("研修CSVに変更なし（マージ省略）")
+        return None
+
+    merged = merge_csv_and_renumber([DAILY_DIR / key for key in keys])
+    web_ids = web_id_strings(merged["Web連携ID"]) if "Web連携ID" in merged.columns else set()
+    previous_ids = set(previous_merge.get("web_ids", []))
+    changes = {
+        "generated_at": now,
+        "file": output_name,
+        "changed_dates": changed_dates,
+        "added": sorted(web_ids - previous_ids),
+        "removed": sorted(previous_ids - web_ids),
+    }
+    state["merged"] = {"file": output_name, "hashes": hashes, "web_ids": sorted(web_ids)}
+    save_download_state(state)
+
+    temp_file = CHANGES_FILE.with_suffix(".tmp")
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(changes, f, ensure_ascii=False, indent=2)
+    temp_file.replace(CHANGES_FILE)
+    print(f"[変更] 日付: {', '.join(changed_dates) or 'なし'} / 追加: {len(changes['added'])}件 / 削除: {len(changes['removed'])}件")
+    return changes
+
+async def download_dates(login_id: str, password: str, target_dates: list[datetime]) -> tuple[list[dict], int]:
+    """target_datesの研修CSVを DATA_DIR/{yymmdd}_webinsource.csv に保存。戻り値は (所要時間, ログイン回数)"""
+    concurrency = 4
+    sem = asyncio.Semaphore(concurrency)
+
+    # 公開講座一覧のキャッシュを先に作り、整形を行う各プロセスがExcelを読み直さないようにする
+    await asyncio.to_thread(load_koukaikouza_table)
+    # APIプロセスのスレッド（ブラウザプール等）の状態を引き継がないよう、forkせずに起動する
+    executor = ProcessPoolExecutor(
+        settings.DOWNLOAD_PROCESS_WORKERS, mp_context=multiprocessing.get_context("forkserver")
+    ) if settings.DOWNLOAD_PROCESS_WORKERS > 0 else None
+
+    async with async_playwright() as p:
+
+        #await download_plants(p, target_dates, login_id, plants_password)
+
+        # ブラウザ起動とログインはジョブ全体で1回。日付毎の処理は同じコンテキストの別ページで並列に行う
+        browser = await p.chromium.launch(headless=True)
+        try:
+            context = await browser.new_context(accept_downloads=True)
+            session = DownloadSession(context, login_id, password, executor)
+            await session.login()
+
+            timings = None
+            if settings.DOWNLOAD_RANGE_SEARCH and len(target_dates) > 1:
+                # 期間をまとめて1回で検索（件数が多すぎる・失敗した場合は日付毎の検索へ）
+                range_timings = await download_webinsource_for_range(session, target_dates)
+                if range_timings is not None:
+                    timings = [range_timings]
+                else:
+                    print("期間検索を使えないため、日付毎に検索します")
+
+            if timings is None:
+                async def sem_task(d):
+                    async with sem:
+                        return await download_webinsource_for_date(session, d)
+
+                timings = await asyncio.gather(*(sem_task(d) for d in target_dates))
+        finally:
+            await browser.close()
+            if executor is not None:
+                executor.shutdown()
+
+    return list(timings), 1 + session.relogins
 
 async def run_parallel_downloads(login_id: str, password: str):
     days_ahead = 10
-    concurrency = 4
 
     today = date.today()
     target_dates = [
@@ -207,19 +569,31 @@ async def run_parallel_downloads(login_id: str, password: str):
         if is_business_day(today + timedelta(days=i))
     ]
 
-    sem = asyncio.Semaphore(concurrency)
-
-    async with async_playwright() as p:
-
-        #await download_plants(p, target_dates, login_id, plants_password)
-
-        async def sem_task(d):
-            async with sem:
-                await download_webinsource_for_date(p, d, login_id, password)
-
-        await asyncio.gather(*(sem_task(d) for d in target_dates))
-
-    merge_csv_and_renumber()
+    started = time.monotonic()
+    state = None
+    fetch_dates = target_dates
+    if settings.DOWNLOAD_INCREMENTAL:
+        # 取得し直す間隔を過ぎた日付だけ取得する
+        state = load_download_state()
+        fetch_dates = stale_dates(target_dates, state, datetime.now())
+        print(f"取得対象: {len(fetch_dates)}/{len(target_dates)}日")
+
+    timings, logins = [], 0
+    if fetch_dates:
+        timings, logins = await download_dates(login_id, password, fetch_dates)
+
+    if state is None:
+        merge_csv_and_renumber()
+    else:
+        refresh_incremental(target_dates, fetch_dates, timings, state)
+
+    for t in timings:
+        print(
+            f"[所要時間] {t['date']} {t['status']} 合計{t['total']}秒"
+            f"（検索{t.get('search', '-')} / ダウンロード{t.get('download', '-')} / 整形{t.get('format', '-')}）"
+        )
+    print(f"[所要時間] 全体 {round(time.monotonic() - started, 2)}秒（ログイン{logins}回）")
+    return timings
 
 if __name__ == "__main__":
     login_id = "suc1588"
@@ -4,11 +4,25 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+class ServiceOverloadedError(Exception):
+    """混雑により受け付けられない（429 + Retry-After）"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
 def handle_api_errors(func):
     @wraps(func)
     async def wrapper(*args, **kwargs):
         try:
             return await func(*args, **kwargs)
+        except ServiceOverloadedError as oe:
+            logger.warning(f"Overloaded in {func.__name__}: retry_after={oe.retry_after}")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=str(oe),
+                headers={"Retry-After": str(oe.retry_after)}
+            )
         except ValueError as ve:
             logger.warning(f"Validation error in {func.__name__}: {ve}")
             raise HTTPException(
@@ -0,0 +1,11 @@
+from datetime import datetime
+from pathlib import Path
+from config.settings import settings
+
+def merged_csv_name() -> str:
+    """download.merge_csv_and_renumberが出力する当日のマージ済みCSVのファイル名"""
+    return f"{datetime.now().strftime('%y%m%d')}_webinsource_merged.csv"
+
+def get_today_merged_csv_path() -> Path:
+    """当日のマージ済みCSV"""
+    return settings.DOWNLOADS_DIR / merged_csv_name()
@@ -7,6 +7,7 @@ export const ENDPOINTS = {
   trainingSearch: {
     csv: `${BASE_URL}/api/training-search/csv`,
     detail: (web_id: string) => `${BASE_URL}/api/training-detail/${web_id}`,
+    detailBatch: `${BASE_URL}/api/training-detail/batch`,
   },
   traineeSearch: {
     detail: (applicationId: string) => `${BASE_URL}/api/trainee/detail/${applicationId}`,